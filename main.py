@@ -1,12 +1,13 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi import Request
 from contextlib import asynccontextmanager
 import os
 
 from models.database import init_db
+from services.blueprint_cache import reload_blueprints
 from services.system_hooks import SystemHooks, get_hooks, initialize_system_hooks, mark_hook_executed
 from utils.logger import setup_logging
 from utils.first_run import FirstRunInitializer
@@ -28,6 +29,9 @@ async def lifespan(app: FastAPI):
     initializer = FirstRunInitializer()
     initializer.initialize()
 
+    logger.info("Caching blueprints...")
+    reload_blueprints()
+
     logger.info("Initializing system hooks...")
     initialize_system_hooks()
 
@@ -67,7 +71,8 @@ app = FastAPI(
     title="Mastarr",
     description="Media Server Application Manager",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Float, Boolean, JSON, ARRAY, Text, DateTime, create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import sessionmaker, relationship, Session
 from datetime import datetime
 from typing import Optional
 import os
@@ -36,6 +37,18 @@ class Blueprint(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
 
+    def compile_router(self):
+        """
+        Get the compiled input router for this blueprint.
+
+        Returns:
+            Callable routing (inputs, expanded_schema) to
+            (service_data, compose_data, metadata_data)
+        """
+        # Imported here to avoid a circular import through utils/__init__
+        from utils.schema_router import compile_router
+        return compile_router(self.name, self.id, self.updated_at, self.schema_json)
+
 
 class App(Base):
     """User's installed app instances"""
@@ -61,6 +74,16 @@ class App(Base):
     # Generated compose file path
     compose_file_path = Column(String)
 
+    # Blueprint this app was created from. Must be loaded explicitly
+    # (join/eager load); lazy loading raises to surface N+1 queries.
+    blueprint = relationship(
+        "Blueprint",
+        primaryjoin="App.blueprint_name == Blueprint.name",
+        foreign_keys="App.blueprint_name",
+        lazy="raise",
+        viewonly=True
+    )
+
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     installed_at = Column(DateTime)
@@ -140,17 +163,63 @@ def get_database_url():
     return db_url
 
 
+engine = create_engine(
+    get_database_url(),
+    echo=False,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True
+)
+
+# Request-scoped sessions. Objects stay loaded after commit so responses
+# can be serialized without a reload SELECT.
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# Sessions for long-lived services (installer, generator, loaders)
+ServiceSession = sessionmaker(bind=engine)
+
+
 def get_engine():
-    """Create SQLAlchemy engine"""
-    database_url = get_database_url()
-    return create_engine(database_url, echo=False)
+    """Get the shared SQLAlchemy engine"""
+    return engine
 
 
 def get_session():
-    """Create database session"""
-    engine = get_engine()
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+    """Create database session from the shared connection pool"""
+    return ServiceSession()
+
+
+def get_db():
+    """FastAPI dependency for a request-scoped database session"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def ensure_global_settings(db: Session) -> GlobalSettings:
+    """
+    Get the global settings row, creating it with defaults if missing.
+
+    The insert uses ON CONFLICT DO NOTHING so concurrent first requests
+    can't create duplicate rows.
+    """
+    settings = db.query(GlobalSettings).first()
+    if settings:
+        return settings
+
+    stmt = (
+        pg_insert(GlobalSettings)
+        .values(id=1)
+        .on_conflict_do_nothing(index_elements=[GlobalSettings.id])
+        .returning(GlobalSettings)
+    )
+    settings = db.scalars(stmt).first()
+    db.commit()
+
+    # Another request created the row first
+    return settings or db.query(GlobalSettings).first()
 
 
 def init_db():
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator, field_validator
+from pydantic import BaseModel, Field, validator, field_validator, field_serializer
 from typing import Optional, List, Dict, Any, Literal, Union
 from datetime import datetime
 
@@ -347,6 +347,17 @@ class ServiceSchema(BaseModel):
     stop_grace_period: Optional[str] = None
     stop_signal: Optional[str] = None
 
+    @field_serializer('environment')
+    def serialize_environment(self, v: Optional[Dict[str, Any]]):
+        """Dump environment in compose list form (KEY=value), dropping empty values"""
+        if type(v) is not dict:
+            return v
+        return [
+            key + '=' + str(value)
+            for key, value in v.items()
+            if value != '' and value != {} and value != []
+        ]
+
     class Config:
         extra = "allow"  # Allow additional fields not defined in schema
         exclude_none = True
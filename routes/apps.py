@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from models.database import App, Blueprint, GlobalSettings, get_session
+from typing import List, Dict, Any, Optional
+from models.database import App, GlobalSettings, get_db, ensure_global_settings
 from models.schemas import AppCreate, AppResponse
 from services.installer import AppInstaller
+from services.blueprint_cache import CachedBlueprint, get_blueprint
 from utils.logger import get_logger
 from utils.template_expander import TemplateExpander
 from utils.path_resolver import PathResolver
@@ -16,24 +18,35 @@ logger = get_logger("mastarr.routes.apps")
 router = APIRouter(prefix="/api/apps", tags=["apps"])
 
 
-def get_db():
-    """Dependency for database session"""
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/", response_model=List[AppResponse])
+def list_apps(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List apps ordered by id.
 
+    Pass the X-Next-Cursor header from the previous page as `cursor` for
+    keyset pagination; limit/offset paging is still supported.
+    """
+    query = db.query(App)
+    if cursor is not None:
+        query = query.filter(App.id > cursor)
+    else:
+        query = query.offset(offset)
 
-@router.get("/", response_model=List[AppResponse])
-async def list_apps(db: Session = Depends(get_db)):
-    """List all apps"""
-    apps = db.query(App).all()
+    apps = query.order_by(App.id).limit(limit).all()
+
+    if len(apps) == limit:
+        response.headers["X-Next-Cursor"] = str(apps[-1].id)
     return apps
 
 
 @router.get("/{app_id}", response_model=AppResponse)
-async def get_app(app_id: int, db: Session = Depends(get_db)):
+def get_app(app_id: int, db: Session = Depends(get_db)):
     """Get a specific app"""
     app = db.query(App).filter(App.id == app_id).first()
     if not app:
@@ -42,34 +55,90 @@ async def get_app(app_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=AppResponse)
-async def create_app(app_data: AppCreate, db: Session = Depends(get_db)):
+def create_app(app_data: AppCreate, db: Session = Depends(get_db)):
     """Create a new app instance (without installing)"""
-    db_name = app_data.name.lower().replace(" ", "_")
+    db_name = _db_name_for(app_data.name)
+
+    # Load blueprint to get field schemas
+    blueprint = get_blueprint(app_data.blueprint_name, db)
+    if not blueprint:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Blueprint '{app_data.blueprint_name}' not found"
+        )
+
+    global_settings = ensure_global_settings(db)
+    app = _build_app(app_data, db_name, blueprint, global_settings)
 
-    existing = db.query(App).filter(App.db_name == db_name).first()
-    if existing:
+    # Uniqueness of db_name is enforced by the database
+    db.add(app)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"App with name '{app_data.name}' already exists"
         )
 
-    # Load blueprint to get field schemas
-    blueprint = db.query(Blueprint).filter(
-        Blueprint.name == app_data.blueprint_name
-    ).first()
-    if not blueprint:
+    _log_created(app)
+    return app
+
+
+@router.post("/bulk", response_model=List[AppResponse])
+def create_apps_bulk(apps_data: List[AppCreate], db: Session = Depends(get_db)):
+    """Create several app instances (without installing) in one transaction"""
+    db_names = [_db_name_for(app_data.name) for app_data in apps_data]
+
+    duplicates = {name for name in db_names if db_names.count(name) > 1}
+    if duplicates:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Duplicate app names in request: {', '.join(sorted(duplicates))}"
+        )
+
+    blueprint_names = {app_data.blueprint_name for app_data in apps_data}
+    blueprints = {name: get_blueprint(name, db) for name in blueprint_names}
+    missing = {name for name, blueprint in blueprints.items() if blueprint is None}
+    if missing:
         raise HTTPException(
             status_code=404,
-            detail=f"Blueprint '{app_data.blueprint_name}' not found"
+            detail=f"Blueprints not found: {', '.join(sorted(missing))}"
         )
 
-    # Load global settings for template expansion
-    global_settings = db.query(GlobalSettings).first()
-    if not global_settings:
-        global_settings = GlobalSettings()
-        db.add(global_settings)
+    global_settings = ensure_global_settings(db)
+    apps = [
+        _build_app(app_data, db_name, blueprints[app_data.blueprint_name], global_settings)
+        for app_data, db_name in zip(apps_data, db_names)
+    ]
+
+    db.add_all(apps)
+    try:
         db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="One or more apps already exist"
+        )
+
+    for app in apps:
+        _log_created(app)
+    return apps
+
+
+def _db_name_for(name: str) -> str:
+    """Derive the database-safe app name from its display name"""
+    return name.lower().replace(" ", "_")
+
 
+def _build_app(
+    app_data: AppCreate,
+    db_name: str,
+    blueprint: CachedBlueprint,
+    global_settings: GlobalSettings
+) -> App:
+    """Expand the blueprint, apply defaults and route inputs into a new App"""
     # Expand template variables in blueprint schema
     expander = TemplateExpander(global_settings, db_name)
     expanded_schema = expander.expand_blueprint_schema(blueprint.schema_json)
@@ -84,7 +153,7 @@ async def create_app(app_data: AppCreate, db: Session = Depends(get_db)):
         expanded_schema
     )
 
-    app = App(
+    return App(
         name=app_data.name,
         db_name=db_name,
         blueprint_name=app_data.blueprint_name,
@@ -95,17 +164,15 @@ async def create_app(app_data: AppCreate, db: Session = Depends(get_db)):
         status="configured"
     )
 
-    db.add(app)
-    db.commit()
-    db.refresh(app)
 
+def _log_created(app: App):
+    """Log a summary of a newly created app"""
     logger.info(
         f"Created app: {app.name} "
-        f"(service: {len(service_data)} fields, "
-        f"compose: {len(compose_data)} fields, "
-        f"metadata: {len(metadata_data)} fields)"
+        f"(service: {len(app.service_data)} fields, "
+        f"compose: {len(app.compose_data)} fields, "
+        f"metadata: {len(app.metadata_data)} fields)"
     )
-    return app
 
 
 @router.post("/{app_id}/install")
@@ -118,11 +185,17 @@ async def install_app(app_id: int, db: Session = Depends(get_db)):
     if app.status == "running":
         raise HTTPException(status_code=400, detail="App is already running")
 
-    installer = AppInstaller(db)
+    app_name = app.name
+
+    # Return the request's connection to the pool before the long-running
+    # install; the installer uses its own session for status updates
+    db.close()
+
+    installer = AppInstaller()
 
     try:
         await installer.install_single_app(app_id)
-        return {"status": "success", "message": f"{app.name} installed successfully"}
+        return {"status": "success", "message": f"{app_name} installed successfully"}
     except Exception as e:
         logger.error(f"Installation failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -173,17 +246,11 @@ async def update_app(app_id: int, app_data: dict, db: Session = Depends(get_db))
     # Update inputs if provided
     if "inputs" in app_data:
         # Load blueprint for schema routing
-        blueprint = db.query(Blueprint).filter(
-            Blueprint.name == app.blueprint_name
-        ).first()
+        blueprint = get_blueprint(app.blueprint_name, db)
 
         if blueprint:
             # Load global settings for template expansion
-            global_settings = db.query(GlobalSettings).first()
-            if not global_settings:
-                global_settings = GlobalSettings()
-                db.add(global_settings)
-                db.commit()
+            global_settings = ensure_global_settings(db)
 
             # Expand template variables in blueprint schema
             expander = TemplateExpander(global_settings, app.db_name)
@@ -212,8 +279,6 @@ async def update_app(app_id: int, app_data: dict, db: Session = Depends(get_db))
     blueprint_name = app.blueprint_name
     container_name = app.service_data.get('container_name', app.name)
 
-    db.refresh(app)
-
     # If app was running, run update hooks and restart
     if was_running:
         # Run pre-update hook
@@ -231,6 +296,10 @@ async def update_app(app_id: int, app_data: dict, db: Session = Depends(get_db))
         stack_path = path_resolver.get_stack_path(app.db_name)
         compose_path = stack_path / "docker-compose.yml"
 
+        # Release the request's connection while containers are recreated;
+        # the session reconnects when the app is re-fetched below
+        db.close()
+
         # Stop the existing containers
         if compose_path.exists():
             try:
@@ -250,7 +319,7 @@ async def update_app(app_id: int, app_data: dict, db: Session = Depends(get_db))
                 logger.warning(f"Failed to stop containers before update: {e.stderr}")
 
         # Reinstall with new configuration (using is_initial_install=False to avoid install hooks)
-        installer = AppInstaller(db)
+        installer = AppInstaller()
         try:
             await installer.install_single_app(app_id_stored, is_initial_install=False)
             logger.info(f"Updated and restarted app: {app_name_stored}")
@@ -427,13 +496,16 @@ async def delete_app(app_id: int, db: Session = Depends(get_db)):
 
 def _route_inputs_to_schemas(
     inputs: Dict[str, Any],
-    blueprint: Blueprint,
+    blueprint: CachedBlueprint,
     expanded_schema: Dict[str, Any]
 ) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     """
     Route user inputs to correct schemas based on blueprint field definitions.
     Handles compound fields (type: "object") and routes them to the correct location.
 
+    Routing uses the blueprint's compiled router, so field definitions are
+    only parsed once per blueprint version rather than on every call.
+
     Args:
         inputs: User's form inputs (with defaults applied)
         blueprint: Blueprint with field schemas
@@ -442,162 +514,5 @@ def _route_inputs_to_schemas(
     Returns:
         Tuple of (service_data, compose_data, metadata_data)
     """
-    service_data = {}
-    compose_data = {}
-    metadata_data = {}
-
-    for field_name, field_value in inputs.items():
-        field_schema = expanded_schema.get(field_name)
-        if not field_schema:
-            # Field not in blueprint, skip
-            continue
-
-        # Skip fields with compose_transform - they'll be handled by transform phase
-        if field_schema.get('compose_transform'):
-            continue
-
-        # Get schema routing from field (dot notation)
-        schema_path = field_schema.get('schema')
-        if not schema_path:
-            # No schema defined, default to service
-            schema_path = 'service'
-
-        # Skip wildcard schemas (e.g., "service.environment.*") - handled by compose_generator
-        if schema_path.endswith('.*'):
-            continue
-
-        # Parse schema path: "service.image", "compose.networks", "metadata.admin_user", "env.TAG"
-        parts = schema_path.split('.', 1)
-        schema_type = parts[0]
-
-        # Skip env.* fields - they go to .env file only, not compose or metadata
-        if schema_type == 'env':
-            continue
-
-        # Handle compound fields (type: "object")
-        # These are already structured objects, so we append them to arrays
-        field_type = field_schema.get('type')
-        if field_type == 'object' and isinstance(field_value, dict):
-            # Compound field like port_mapping or volume_mapping
-            # Route to the target as an array element
-            if schema_type == 'service':
-                if len(parts) > 1:
-                    target_path = parts[1]
-                    # Append to array (e.g., service.ports, service.volumes)
-                    _append_to_array(service_data, target_path, field_value)
-                else:
-                    service_data[field_name] = field_value
-
-            elif schema_type == 'compose':
-                if len(parts) > 1:
-                    _set_nested_value(compose_data, parts[1], field_value)
-                else:
-                    compose_data[field_name] = field_value
-
-            elif schema_type == 'metadata':
-                if len(parts) > 1:
-                    _set_nested_value(metadata_data, parts[1], field_value)
-                else:
-                    metadata_data[field_name] = field_value
-
-        else:
-            # Regular field routing
-            if schema_type == 'service':
-                if len(parts) > 1:
-                    target_path = parts[1]
-
-                    # Special handling for networks - must be a list
-                    if target_path == 'networks' and isinstance(field_value, str):
-                        # Convert string network name to list
-                        field_value = [field_value]
-
-                    # Nested path like "service.environment.VAR_NAME"
-                    _set_nested_value(service_data, target_path, field_value)
-                else:
-                    # Direct service field (shouldn't happen, but handle it)
-                    service_data[field_name] = field_value
-
-            elif schema_type == 'compose':
-                if len(parts) > 1:
-                    # Special handling for JSON strings that need parsing
-                    if isinstance(field_value, str) and field_value.startswith('{'):
-                        try:
-                            import json
-                            field_value = json.loads(field_value)
-                        except:
-                            pass  # Keep as string if parsing fails
-
-                    _set_nested_value(compose_data, parts[1], field_value)
-                else:
-                    compose_data[field_name] = field_value
-
-            elif schema_type == 'metadata':
-                if len(parts) > 1:
-                    _set_nested_value(metadata_data, parts[1], field_value)
-                else:
-                    metadata_data[field_name] = field_value
-
-    return service_data, compose_data, metadata_data
-
-
-def _set_nested_value(data: Dict[str, Any], path: str, value: Any):
-    """
-    Set a value at a nested path like 'environment.VAR_NAME' or just 'image'.
-
-    Args:
-        data: Dictionary to modify
-        path: Dot-separated path (e.g., "environment.VAR_NAME" or "image")
-        value: Value to set
-    """
-    if '.' in path:
-        # Nested path
-        keys = path.split('.')
-        current = data
-
-        for key in keys[:-1]:
-            if key not in current:
-                current[key] = {}
-            current = current[key]
-
-        current[keys[-1]] = value
-    else:
-        # Simple path
-        data[path] = value
-
-
-def _append_to_array(data: Dict[str, Any], path: str, value: Any):
-    """
-    Append a value to an array at a nested path.
-    Creates the array if it doesn't exist.
-
-    Args:
-        data: Dictionary to modify
-        path: Dot-separated path (e.g., "ports" or "nested.array")
-        value: Value to append to the array
-    """
-    if '.' in path:
-        # Nested path
-        keys = path.split('.')
-        current = data
-
-        for key in keys[:-1]:
-            if key not in current:
-                current[key] = {}
-            current = current[key]
-
-        # Ensure the target is an array
-        final_key = keys[-1]
-        if final_key not in current:
-            current[final_key] = []
-        elif not isinstance(current[final_key], list):
-            current[final_key] = [current[final_key]]
-
-        current[final_key].append(value)
-    else:
-        # Simple path
-        if path not in data:
-            data[path] = []
-        elif not isinstance(data[path], list):
-            data[path] = [data[path]]
-
-        data[path].append(value)
+    router = blueprint.compile_router()
+    return router(inputs, expanded_schema)
@@ -1,45 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from models.database import Blueprint, App, GlobalSettings, get_session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only, raiseload
+from typing import Dict, Hashable, List, Optional, Tuple
+from models.database import Blueprint, App, get_db, ensure_global_settings
 from models.schemas import BlueprintResponse
 from utils.logger import get_logger
 from utils.template_expander import TemplateExpander
+from services.blueprint_cache import get_blueprint as get_cached_blueprint, get_blueprints_state
 
 logger = get_logger("mastarr.routes.blueprints")
 router = APIRouter(prefix="/api/blueprints", tags=["blueprints"])
 
-
-def get_db():
-    """Dependency for database session"""
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
+# (blueprints state, categories) - rebuilt after blueprints are reloaded,
+# including reloads done by another process
+_categories_cache: Optional[Tuple[Hashable, List[str]]] = None
 
 
 @router.get("/", response_model=List[BlueprintResponse])
-async def list_blueprints(
+def list_blueprints(
     category: str = None,
     visible_only: bool = True,
     db: Session = Depends(get_db)
 ):
     """List all available blueprints"""
-    query = db.query(Blueprint)
+    # Every response field is a plain column; raiseload guards against
+    # relationships being lazily loaded per row during serialization
+    query = select(Blueprint).options(raiseload('*'))
 
     if visible_only:
-        query = query.filter(Blueprint.visible == True)
+        query = query.where(Blueprint.visible == True)
 
     if category:
-        query = query.filter(Blueprint.category == category)
+        query = query.where(Blueprint.category == category)
 
-    blueprints = query.order_by(Blueprint.install_order).all()
+    blueprints = db.scalars(query.order_by(Blueprint.install_order)).all()
     return blueprints
 
 
 @router.get("/{blueprint_name}", response_model=BlueprintResponse)
-async def get_blueprint(blueprint_name: str, db: Session = Depends(get_db)):
+def get_blueprint(blueprint_name: str, db: Session = Depends(get_db)):
     """Get a specific blueprint"""
     blueprint = db.query(Blueprint).filter(Blueprint.name == blueprint_name).first()
     if not blueprint:
@@ -48,7 +47,7 @@ async def get_blueprint(blueprint_name: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{blueprint_name}/schema")
-async def get_blueprint_schema(
+def get_blueprint_schema(
     blueprint_name: str,
     expand_templates: bool = True,
     db: Session = Depends(get_db)
@@ -61,16 +60,12 @@ async def get_blueprint_schema(
         blueprint_name: Name of the blueprint
         expand_templates: Whether to expand ${GLOBAL.*} template variables (default: True)
     """
-    blueprint = db.query(Blueprint).filter(Blueprint.name == blueprint_name).first()
+    blueprint = get_cached_blueprint(blueprint_name, db)
     if not blueprint:
         raise HTTPException(status_code=404, detail="Blueprint not found")
 
     # Get global settings for template expansion
-    global_settings = db.query(GlobalSettings).first()
-    if not global_settings:
-        global_settings = GlobalSettings()
-        db.add(global_settings)
-        db.commit()
+    global_settings = ensure_global_settings(db)
 
     # Expand templates if requested
     schema_to_use = blueprint.schema_json
@@ -79,14 +74,25 @@ async def get_blueprint_schema(
         expander = TemplateExpander(global_settings, blueprint_name)
         schema_to_use = expander.expand_blueprint_schema(blueprint.schema_json)
 
-    installed_apps = db.query(App).filter(App.status == "running").all()
+    # Only the columns check_prerequisite reads are loaded
+    installed_apps = (
+        db.query(App)
+        .options(load_only(App.blueprint_name, App.status, App.raw_inputs))
+        .filter(App.status == "running")
+        .all()
+    )
+
+    # First app per blueprint, matching the previous linear search
+    installed_by_name: Dict[str, App] = {}
+    for app in installed_apps:
+        installed_by_name.setdefault(app.blueprint_name, app)
 
     visible_schema = {}
 
     for field_name, field in schema_to_use.items():
         if 'prerequisites' in field and field['prerequisites']:
             if not all(
-                check_prerequisite(prereq, installed_apps)
+                check_prerequisite(prereq, installed_by_name)
                 for prereq in field['prerequisites']
             ):
                 continue
@@ -100,12 +106,9 @@ async def get_blueprint_schema(
     }
 
 
-def check_prerequisite(prereq: dict, installed_apps: List[App]) -> bool:
+def check_prerequisite(prereq: dict, installed_by_name: Dict[str, App]) -> bool:
     """Check if a prerequisite is satisfied"""
-    app = next(
-        (a for a in installed_apps if a.blueprint_name == prereq['app_name']),
-        None
-    )
+    app = installed_by_name.get(prereq['app_name'])
 
     if not app:
         return False
@@ -114,14 +117,23 @@ def check_prerequisite(prereq: dict, installed_apps: List[App]) -> bool:
         return False
 
     if 'input_name' in prereq and 'input_value' in prereq:
-        if app.inputs.get(prereq['input_name']) != prereq['input_value']:
+        if (app.raw_inputs or {}).get(prereq['input_name']) != prereq['input_value']:
             return False
 
     return True
 
 
 @router.get("/categories/list")
-async def list_categories(db: Session = Depends(get_db)):
+def list_categories(db: Session = Depends(get_db)):
     """Get list of all blueprint categories"""
-    categories = db.query(Blueprint.category).distinct().all()
-    return [cat[0] for cat in categories]
+    global _categories_cache
+
+    state = get_blueprints_state(db)
+    if _categories_cache is not None and _categories_cache[0] == state:
+        return _categories_cache[1]
+
+    categories = db.scalars(
+        select(Blueprint.category).distinct().order_by(Blueprint.category)
+    ).all()
+    _categories_cache = (state, categories)
+    return categories
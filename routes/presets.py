@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
+from functools import lru_cache
 
-from models.database import get_session
+from models.database import get_db
 from services.preset_service import PresetService
 from utils.logger import get_logger
 
@@ -10,22 +11,18 @@ logger = get_logger(__name__)
 router = APIRouter(prefix="/api", tags=["presets"])
 
 
-def get_db():
-    """Dependency for database session"""
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
+@lru_cache(maxsize=1)
+def get_preset_service() -> PresetService:
+    """Dependency for the shared preset service"""
+    return PresetService()
 
 
 @router.get("/presets")
-async def list_presets():
+def list_presets(preset_service: PresetService = Depends(get_preset_service)):
     """
     List all available presets
     """
     try:
-        preset_service = PresetService()
         presets = preset_service.get_all_presets()
         return {"presets": presets}
     except Exception as e:
@@ -34,12 +31,14 @@ async def list_presets():
 
 
 @router.get("/presets/{preset_id}")
-async def get_preset(preset_id: str):
+def get_preset(
+    preset_id: str,
+    preset_service: PresetService = Depends(get_preset_service)
+):
     """
     Get details of a specific preset
     """
     try:
-        preset_service = PresetService()
         preset = preset_service.get_preset(preset_id)
 
         if not preset:
@@ -54,13 +53,16 @@ async def get_preset(preset_id: str):
 
 
 @router.get("/presets/{preset_id}/required-inputs")
-async def get_required_inputs(preset_id: str, db: Session = Depends(get_db)):
+def get_required_inputs(
+    preset_id: str,
+    db: Session = Depends(get_db),
+    preset_service: PresetService = Depends(get_preset_service)
+):
     """
     Analyze a preset and return required inputs that need user input.
     Also returns information about missing blueprints and already-existing apps.
     """
     try:
-        preset_service = PresetService()
         result = preset_service.analyze_required_inputs(preset_id, db)
         return result
     except ValueError as e:
@@ -71,10 +73,11 @@ async def get_required_inputs(preset_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/presets/{preset_id}/apply")
-async def apply_preset(
+def apply_preset(
     preset_id: str,
     payload: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    preset_service: PresetService = Depends(get_preset_service)
 ):
     """
     Apply a preset by creating pending apps.
@@ -103,7 +106,6 @@ async def apply_preset(
     try:
         user_inputs = payload.get('inputs', {})
 
-        preset_service = PresetService()
         result = preset_service.apply_preset(preset_id, user_inputs, db)
 
         created_count = len(result['created_apps'])
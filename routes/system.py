@@ -1,24 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from models.database import GlobalSettings, App, Blueprint, get_session
+from typing import List, Dict, Any, Optional, Tuple
+from models.database import GlobalSettings, App, Blueprint, get_db, get_session, ensure_global_settings
 from models.schemas import GlobalSettingsResponse
 from utils.first_run import FirstRunInitializer
 from utils.logger import get_logger
+from utils.docker_client import get_docker_client
+from utils.path_resolver import clear_host_path_cache
+from utils.blueprint_plan import get_global_fields
 from services.compose_generator import ComposeGenerator
+import asyncio
 import docker
 
 logger = get_logger("mastarr.routes.system")
 router = APIRouter(prefix="/api/system", tags=["system"])
 
-
-def get_db():
-    """Dependency for database session"""
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
+# Maximum number of apps regenerated/restarted at once
+REGENERATE_CONCURRENCY = 8
 
 
 @router.get("/health")
@@ -28,7 +28,7 @@ async def health_check():
 
 
 @router.get("/info")
-async def system_info():
+def system_info():
     """Get system information"""
     initializer = FirstRunInitializer()
     info = initializer.get_system_info()
@@ -36,186 +36,216 @@ async def system_info():
 
 
 @router.get("/settings", response_model=GlobalSettingsResponse)
-async def get_settings(db: Session = Depends(get_db)):
+def get_settings(db: Session = Depends(get_db)):
     """Get global settings"""
-    settings = db.query(GlobalSettings).first()
-    if not settings:
-        settings = GlobalSettings()
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-    return settings
+    return ensure_global_settings(db)
 
 
 @router.put("/settings")
-async def update_settings(
+def update_settings(
     settings_update: Dict[str, Any],
     db: Session = Depends(get_db)
 ):
     """Update global settings"""
-    settings = db.query(GlobalSettings).first()
-    if not settings:
-        settings = GlobalSettings()
-        db.add(settings)
+    settings = ensure_global_settings(db)
 
     # Update fields if provided
-    if 'puid' in settings_update and settings_update['puid'] is not None:
-        settings.puid = settings_update['puid']
-    if 'pgid' in settings_update and settings_update['pgid'] is not None:
-        settings.pgid = settings_update['pgid']
-    if 'umask' in settings_update and settings_update['umask'] is not None:
-        settings.umask = settings_update['umask']
+    changes = {
+        field: settings_update[field]
+        for field in ('puid', 'pgid', 'umask', 'timezone')
+        if settings_update.get(field) is not None
+    }
     if 'user' in settings_update:
         # Allow setting user to None (to clear it)
-        settings.user = settings_update['user'] if settings_update['user'] else None
-    if 'timezone' in settings_update and settings_update['timezone'] is not None:
-        settings.timezone = settings_update['timezone']
-
-    db.commit()
-    db.refresh(settings)
+        changes['user'] = settings_update['user'] if settings_update['user'] else None
+
+    if changes:
+        settings = db.scalars(
+            update(GlobalSettings)
+            .where(GlobalSettings.id == settings.id)
+            .values(**changes)
+            .returning(GlobalSettings)
+        ).one()
+        db.commit()
+        ComposeGenerator.invalidate_settings_cache()
+        clear_host_path_cache()
 
     logger.info(f"Global settings updated: PUID={settings.puid}, PGID={settings.pgid}, UMASK={settings.umask}, USER={settings.user}, TZ={settings.timezone}")
     return settings
 
 
-@router.get("/settings/affected-apps")
-async def get_affected_apps(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def _find_affected_apps(db: Session) -> List[Tuple[App, Blueprint, List[str]]]:
     """
-    Get list of apps that use global settings (PUID, PGID, TZ, USER).
-    These apps will be affected if global settings are changed.
+    Find running apps that rely on global settings.
+    Apps and their blueprints are loaded with a single joined query.
+
+    Returns:
+        List of (app, blueprint, uses_globals) tuples
     """
-    apps = db.query(App).filter(App.status == "running").all()
+    rows = (
+        db.query(App, Blueprint)
+        .join(App.blueprint)
+        .filter(App.status == "running")
+        .all()
+    )
     affected = []
 
-    for app in apps:
-        blueprint = db.query(Blueprint).filter(Blueprint.name == app.blueprint_name).first()
-        if not blueprint:
-            continue
-
-        uses_globals = []
+    for app, blueprint in rows:
         service_data = app.service_data or {}
         env = service_data.get("environment", {})
 
-        for field_name, field_schema in blueprint.schema_json.items():
-            use_global = field_schema.get("use_global")
-            if not use_global:
-                continue
+        # A global is in use when its field is missing OR is None
+        uses_globals = {
+            use_global
+            for use_global, is_env, key in get_global_fields(blueprint)
+            if (env if is_env else service_data).get(key) is None
+        }
 
-            schema_path = field_schema.get("schema", "")
-            parts = schema_path.split(".")
+        if uses_globals:
+            affected.append((app, blueprint, list(uses_globals)))
 
-            if len(parts) == 2 and parts[0] == "service":
-                field_key = parts[1]
-                # Check if field is missing OR is None
-                if field_key not in service_data or service_data[field_key] is None:
-                    uses_globals.append(use_global)
+    return affected
 
-            elif len(parts) == 3 and parts[0] == "service" and parts[1] == "environment":
-                env_key = parts[2]
-                # Check if env var is missing OR is None
-                if env_key not in env or env[env_key] is None:
-                    uses_globals.append(use_global)
 
-        if uses_globals:
-            affected.append({
-                "id": app.id,
-                "name": app.name,
-                "blueprint_name": app.blueprint_name,
-                "uses_globals": list(set(uses_globals))
-            })
+@router.get("/settings/affected-apps")
+def get_affected_apps(db: Session = Depends(get_db)) -> ORJSONResponse:
+    """
+    Get list of apps that use global settings (PUID, PGID, TZ, USER).
+    These apps will be affected if global settings are changed.
+    """
+    affected = [
+        {
+            "id": app.id,
+            "name": app.name,
+            "blueprint_name": app.blueprint_name,
+            "uses_globals": uses_globals
+        }
+        for app, blueprint, uses_globals in _find_affected_apps(db)
+    ]
 
-    return {
+    # Payload is already JSON-safe, skip the jsonable_encoder pass
+    return ORJSONResponse({
         "count": len(affected),
         "apps": affected
-    }
+    })
+
+
+def _regenerate_one(app_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Regenerate the compose file for a single app and restart its container.
+    Runs in a worker thread with its own session; the docker client is the
+    shared process-wide one.
+
+    Returns:
+        Result dict with "name" and either "status" or "error", or None if
+        the app (or its blueprint) no longer exists
+    """
+    db = get_session()
+    generator = ComposeGenerator(session=db)
+    try:
+        row = (
+            db.query(App, Blueprint)
+            .join(App.blueprint)
+            .filter(App.id == app_id)
+            .one_or_none()
+        )
+        if row is None:
+            # Deleted since the affected apps were listed, skip it
+            return None
+        app, blueprint = row
+
+        try:
+            logger.info(f"Regenerating compose for {app.name} with new global settings")
+
+            compose = generator.generate(app, blueprint)
+            compose_path = app.compose_file_path
+
+            if not compose_path:
+                return {"name": app.name, "status": "no_compose_file"}
+
+            generator.write_compose_file(compose, compose_path)
+
+            container_name = app.service_data.get("container_name", app.db_name)
+            try:
+                container = get_docker_client().containers.get(container_name)
+                container.restart()
+                logger.info(f"Restarted container: {container_name}")
+                return {"name": app.name, "status": "restarted"}
+            except docker.errors.NotFound:
+                logger.warning(f"Container {container_name} not found, skipping restart")
+                return {"name": app.name, "status": "compose_updated_no_restart"}
+            except Exception as e:
+                logger.error(f"Failed to restart {app.name}: {str(e)}")
+                return {"name": app.name, "error": str(e)}
+
+        except Exception as e:
+            logger.error(f"Failed to regenerate {app.name}: {str(e)}")
+            return {"name": app.name, "error": str(e)}
+    finally:
+        generator.close()
+        db.close()
 
 
 @router.post("/settings/regenerate-affected")
-async def regenerate_affected_apps(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def regenerate_affected_apps(db: Session = Depends(get_db)) -> ORJSONResponse:
     """
     Regenerate compose files and restart apps that use global settings.
     This applies the new global settings to affected apps.
+
+    Apps are independent of each other, so they are regenerated and
+    restarted concurrently in worker threads.
     """
-    affected_response = await get_affected_apps(db)
-    affected_apps = affected_response["apps"]
+    affected_apps = await asyncio.to_thread(_find_affected_apps, db)
+    db.close()
 
     if not affected_apps:
-        return {
+        return ORJSONResponse({
             "success": True,
             "message": "No apps are affected by global settings",
             "regenerated": []
-        }
+        })
 
-    docker_client = docker.from_env()
-    generator = ComposeGenerator()
-    regenerated = []
-    errors = []
+    # Bound parallelism so restarts don't swamp the Docker daemon
+    semaphore = asyncio.Semaphore(REGENERATE_CONCURRENCY)
 
-    for app_info in affected_apps:
-        try:
-            app = db.query(App).filter(App.id == app_info["id"]).first()
-            if not app:
-                continue
+    async def run(app_id: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await asyncio.to_thread(_regenerate_one, app_id)
 
-            blueprint = db.query(Blueprint).filter(Blueprint.name == app.blueprint_name).first()
-            if not blueprint:
-                continue
+    results = await asyncio.gather(
+        *[run(app.id) for app, blueprint, uses_globals in affected_apps],
+        return_exceptions=True
+    )
 
-            logger.info(f"Regenerating compose for {app.name} with new global settings")
-
-            compose = generator.generate(app, blueprint)
-            compose_path = app.compose_file_path
-
-            if compose_path:
-                generator.write_compose_file(compose, compose_path)
-
-                try:
-                    container_name = app.service_data.get("container_name", app.db_name)
-                    container = docker_client.containers.get(container_name)
-                    container.restart()
-                    logger.info(f"Restarted container: {container_name}")
-
-                    regenerated.append({
-                        "name": app.name,
-                        "status": "restarted"
-                    })
-                except docker.errors.NotFound:
-                    logger.warning(f"Container {container_name} not found, skipping restart")
-                    regenerated.append({
-                        "name": app.name,
-                        "status": "compose_updated_no_restart"
-                    })
-                except Exception as e:
-                    logger.error(f"Failed to restart {app.name}: {str(e)}")
-                    errors.append({
-                        "name": app.name,
-                        "error": str(e)
-                    })
-
-        except Exception as e:
-            logger.error(f"Failed to regenerate {app_info['name']}: {str(e)}")
-            errors.append({
-                "name": app_info["name"],
-                "error": str(e)
-            })
+    regenerated = []
+    errors = []
 
-    generator.close()
+    for (app, blueprint, uses_globals), result in zip(affected_apps, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to regenerate {app.name}: {str(result)}")
+            errors.append({"name": app.name, "error": str(result)})
+        elif result is None:
+            continue
+        elif "error" in result:
+            errors.append(result)
+        elif result["status"] != "no_compose_file":
+            regenerated.append(result)
 
-    return {
+    return ORJSONResponse({
         "success": len(errors) == 0,
         "regenerated": regenerated,
         "errors": errors if errors else None
-    }
+    })
 
 
 @router.get("/docker-networks")
-async def list_docker_networks() -> Dict[str, Any]:
+def list_docker_networks() -> Dict[str, Any]:
     """
     Get list of available Docker networks.
     Filters out system networks (none, host) for cleaner UI.
     """
     try:
-        docker_client = docker.from_env()
+        docker_client = get_docker_client()
         networks = docker_client.networks.list()
 
         network_list = []
@@ -0,0 +1,158 @@
+"""
+In-process blueprint cache.
+
+Blueprints are effectively read-only at runtime: they are only written when
+the blueprint files are (re)loaded. Hot paths read immutable snapshots from
+memory instead of querying the blueprints table on every request. The cache
+is rebuilt whenever the blueprint loader reports a new version, or when a
+cheap fingerprint of the blueprints table changes (blueprints reloaded by
+another process, e.g. `python load_blueprints.py` via docker exec).
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.database import Blueprint, get_session
+from utils.blueprint_loader import get_blueprints_version
+from utils.logger import get_logger
+
+logger = get_logger("mastarr.blueprint_cache")
+
+
+@dataclass(frozen=True)
+class CachedBlueprint:
+    """Detached, read-only snapshot of a Blueprint row"""
+    id: int
+    name: str
+    display_name: str
+    category: str
+    install_order: float
+    prerequisites: List[str]
+    schema_json: Dict[str, Any]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, blueprint: Blueprint) -> "CachedBlueprint":
+        return cls(
+            id=blueprint.id,
+            name=blueprint.name,
+            display_name=blueprint.display_name,
+            category=blueprint.category,
+            install_order=blueprint.install_order,
+            prerequisites=list(blueprint.prerequisites or []),
+            schema_json=blueprint.schema_json,
+            updated_at=blueprint.updated_at
+        )
+
+    def compile_router(self):
+        """Get the compiled input router for this blueprint version"""
+        from utils.schema_router import compile_router
+        return compile_router(self.name, self.id, self.updated_at, self.schema_json)
+
+
+_blueprints: Dict[str, CachedBlueprint] = {}
+_state: Optional[Hashable] = None
+
+# How often the blueprints table fingerprint is re-read; changes made by
+# other processes are picked up within this many seconds
+BLUEPRINT_CHECK_INTERVAL = 5.0
+_db_fingerprint: Optional[Tuple[Any, ...]] = None
+_next_check = 0.0
+
+
+def get_blueprints_state(db: Session = None) -> Hashable:
+    """
+    Get a value that changes whenever blueprints change, in any process.
+
+    Combines the in-process loader version with a fingerprint of the
+    blueprints table (row count, max id, max updated_at), which is re-read
+    at most every BLUEPRINT_CHECK_INTERVAL seconds.
+
+    Args:
+        db: Optional session used for the fingerprint query
+
+    Returns:
+        Hashable state to compare against a cached value
+    """
+    global _db_fingerprint, _next_check
+
+    now = time.monotonic()
+    if now >= _next_check:
+        own_session = db is None
+        db = db or get_session()
+        try:
+            _db_fingerprint = tuple(db.execute(
+                select(func.count(Blueprint.id), func.max(Blueprint.id), func.max(Blueprint.updated_at))
+            ).one())
+        finally:
+            if own_session:
+                db.close()
+        _next_check = now + BLUEPRINT_CHECK_INTERVAL
+
+    return (get_blueprints_version(), _db_fingerprint)
+
+
+def reload_blueprints(db: Session = None):
+    """
+    Rebuild the cache from the database.
+
+    The new mapping is built completely before being swapped in, so readers
+    never see a partially loaded cache.
+    """
+    global _blueprints, _state
+
+    state = get_blueprints_state(db)
+    own_session = db is None
+    db = db or get_session()
+    try:
+        blueprints = {bp.name: CachedBlueprint.from_row(bp) for bp in db.query(Blueprint).all()}
+    finally:
+        if own_session:
+            db.close()
+
+    _blueprints = blueprints
+    _state = state
+    logger.info(f"Cached {len(blueprints)} blueprint(s)")
+
+
+def get_blueprint(name: str, db: Session = None) -> Optional[CachedBlueprint]:
+    """
+    Get a blueprint snapshot by name.
+
+    Args:
+        name: Blueprint name
+        db: Optional session used to reload or to look up a blueprint
+            missing from the cache
+
+    Returns:
+        CachedBlueprint, or None if no such blueprint exists
+    """
+    global _blueprints
+
+    if _state != get_blueprints_state(db):
+        reload_blueprints(db)
+
+    blueprint = _blueprints.get(name)
+    if blueprint is not None:
+        return blueprint
+
+    # Fall back to the database for blueprints added outside the loader
+    own_session = db is None
+    db = db or get_session()
+    try:
+        row = db.query(Blueprint).filter(Blueprint.name == name).first()
+    finally:
+        if own_session:
+            db.close()
+
+    if row is None:
+        return None
+
+    blueprint = CachedBlueprint.from_row(row)
+    _blueprints = {**_blueprints, name: blueprint}
+    return blueprint
@@ -1,7 +1,12 @@
+import hashlib
+import logging
 import yaml
+import orjson
 import os
-from typing import Dict, Any
-from datetime import datetime
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union
 from models.schemas import (
     ComposeSchema,
     ServiceSchema,
@@ -11,13 +16,73 @@ from models.schemas import (
     PortMappingSchema,
     ServiceNetworkConfigSchema
 )
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from models.database import App, Blueprint, GlobalSettings, get_session
 from utils.logger import get_logger
 from utils.path_resolver import PathResolver
-from utils.compose_transforms import apply_transform
+from utils.blueprint_plan import (
+    get_env_fields,
+    get_env_list_fields,
+    get_global_fields,
+    get_transform_plan,
+)
+from utils import compose_yaml
+
+try:
+    from yaml import CSafeDumper as _Dumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _Dumper
+
+
+class _ComposeDumper(_Dumper):
+    """Dumper for compose files; compose-specific representers go here"""
+
 
 logger = get_logger("mastarr.compose_generator")
 
+# Skip re-validating ComposeSchema for compose data that validation would
+# pass through unchanged (see _is_trusted_compose)
+TRUSTED_INTERNAL = True
+
+# Core validators, looked up once; validate_python skips the __init__ kwargs path
+_SERVICE_VALIDATOR = ServiceSchema.__pydantic_validator__
+_COMPOSE_VALIDATOR = ComposeSchema.__pydantic_validator__
+
+# Core serializers; to_python skips the BaseModel.model_dump wrapper
+_SERVICE_SERIALIZER = ServiceSchema.__pydantic_serializer__
+_COMPOSE_SERIALIZER = ComposeSchema.__pydantic_serializer__
+
+# First line of generated files, followed by a hash of their content
+_HASH_PREFIX = "# hash:"
+
+# Write buffer for compose files
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+# Global settings change rarely; generate() reuses the last built value mapping
+# until the version is bumped by invalidate_settings_cache() or the TTL
+# expires (catches writes made outside this process)
+SETTINGS_CACHE_TTL = 60.0
+_settings_version = 0
+_settings_cache: Optional[Tuple[int, float, Dict[str, Any]]] = None
+_settings_lock = threading.Lock()
+
+# Values _clean_empty_values descends into
+_CONTAINER_TYPES = (dict, list)
+
+# Service keys whose empty values can't be dropped before validation: required
+# fields, fields with a non-None default, and networks (an empty networks dict
+# is kept in the output)
+_KEEP_EMPTY_SERVICE_KEYS = frozenset(
+    [
+        name for name, field in ServiceSchema.model_fields.items()
+        if field.is_required() or field.default is not None
+    ] + ['networks']
+)
+
+# Top-level network options whose validated form is identical to the input
+_TRUSTED_NETWORK_OPTIONS = {'external': bool, 'internal': bool, 'attachable': bool, 'driver': str}
+
 
 class ComposeGenerator:
     """
@@ -28,55 +93,135 @@ class ComposeGenerator:
     the blueprint schema definitions and user inputs.
     """
 
-    def __init__(self):
-        self.db = get_session()
+    def __init__(self, session: Session = None):
+        """
+        Args:
+            session: Optional database session to reuse. When omitted the
+                     generator opens its own on first use and closes it
+                     in close().
+        """
+        self._owns_session = session is None
+        self._db = session
         self.path_resolver = PathResolver()
 
-    def generate(self, app: App, blueprint: Blueprint) -> ComposeSchema:
+        # One timestamp per generator run, so every .env it writes matches
+        self._run_timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    @property
+    def db(self) -> Session:
+        """Database session, opened lazily since generation rarely needs it"""
+        if self._db is None:
+            self._db = get_session()
+        return self._db
+
+    def generate(self, app: App, blueprint: Blueprint, validate: bool = False) -> Dict[str, Any]:
         """
-        Generate a ComposeSchema object from app's separated schema data.
+        Generate compose data from app's separated schema data.
         No hardcoded injections - everything comes from blueprint definitions.
 
         Args:
             app: App instance with service_data, compose_data, metadata_data
             blueprint: Blueprint definition with field schemas
+            validate: Always run full ComposeSchema validation, even for
+                      compose data that is trusted to pass unchanged
+                      (useful to audit the fast path)
 
         Returns:
-            ComposeSchema object ready to be written to YAML
+            Plain compose dict ready to be written to YAML
         """
         logger.info(f"Generating compose for {app.name} ({blueprint.name})")
 
-        # Get global settings for fallback values
-        global_settings = self.db.query(GlobalSettings).first()
+        # Get global setting values for fallback values
+        global_mapping = self._get_global_mapping()
 
         # Build service config with transforms and globals applied
-        service_config, transform_cache = self._build_service_config(app, blueprint, global_settings)
+        service_config, transform_cache = self._build_service_config(app, blueprint, global_mapping)
 
         # Validate with Pydantic (this also transforms volumes/ports to proper format)
-        service = ServiceSchema(**service_config)
+        service = _SERVICE_VALIDATOR.validate_python(service_config)
 
         # Build compose config from stored data
-        compose_config = app.compose_data.copy() if app.compose_data else {}
-        compose_config['services'] = {app.db_name: service}
+        compose_config = {**(app.compose_data or {}), 'services': {app.db_name: service}}
 
-        # Add custom networks to compose-level networks section
-        if 'custom_networks' in transform_cache:
-            if 'networks' not in compose_config:
-                compose_config['networks'] = {}
+        # Add custom networks to compose-level networks section.
+        # A new dict is built so app.compose_data's networks aren't mutated.
+        custom_networks = transform_cache.get('custom_networks')
+        if custom_networks is not None:
+            networks = compose_config['networks'] = dict(compose_config.get('networks') or {})
+            log_debug = logger.isEnabledFor(logging.DEBUG)
 
-            for network_info in transform_cache['custom_networks']:
+            for network_info in custom_networks:
                 network_name = network_info['name']
                 # Mark all custom networks as external (they exist outside compose)
-                compose_config['networks'][network_name] = {'external': True}
-                logger.debug(f"Added compose-level network: {network_name} (external: true)")
-
-        # Validate complete compose structure
-        compose = ComposeSchema(**compose_config)
+                networks[network_name] = {'external': True}
+                if log_debug:
+                    logger.debug(f"Added compose-level network: {network_name} (external: true)")
+
+        # Validate complete compose structure. The service was validated above;
+        # when the rest is plain trusted data validation would not change it,
+        # so only the service is dumped and no ComposeSchema is built.
+        if not validate and TRUSTED_INTERNAL and _is_trusted_compose(compose_config):
+            # Same key order and None handling as dumping ComposeSchema
+            compose = {
+                'services': {app.db_name: _SERVICE_SERIALIZER.to_python(service, exclude_none=True)}
+            }
+            # Trusted networks are flat option dicts. Copy them, since cleanup
+            # mutates the result in place and they may be app.compose_data's own.
+            networks = compose_config.get('networks')
+            if networks is not None:
+                compose['networks'] = {name: dict(config) for name, config in networks.items()}
+        else:
+            compose = _COMPOSE_SERIALIZER.to_python(
+                _COMPOSE_VALIDATOR.validate_python(compose_config),
+                exclude_none=True
+            )
 
         logger.info(f"✓ Compose generated for {app.name}")
         return compose
 
-    def _build_service_config(self, app: App, blueprint: Blueprint, global_settings: GlobalSettings):
+    def _get_global_mapping(self) -> Dict[str, Any]:
+        """
+        Get global setting values keyed by use_global name (PUID, PGID, UMASK,
+        TZ, USER), served from the process-wide cache when current.
+
+        Returns:
+            Mapping of global names to values; empty if no settings row exists
+        """
+        global _settings_cache
+
+        # Fast path without the lock
+        cached = _settings_cache
+        if cached is not None and cached[0] == _settings_version and cached[1] > time.monotonic():
+            return cached[2]
+
+        with _settings_lock:
+            # Another thread may have reloaded while this one waited
+            cached = _settings_cache
+            version = _settings_version
+            if cached is not None and cached[0] == version and cached[1] > time.monotonic():
+                return cached[2]
+
+            settings = self.db.query(GlobalSettings).first()
+            if settings is None:
+                return {}
+
+            # USER: Use explicit user field if set, otherwise fallback to PUID:PGID
+            global_mapping = {
+                "PUID": settings.puid,
+                "PGID": settings.pgid,
+                "UMASK": settings.umask,
+                "TZ": settings.timezone,
+                "USER": settings.user if settings.user else f"{settings.puid}:{settings.pgid}"
+            }
+            _settings_cache = (version, time.monotonic() + SETTINGS_CACHE_TTL, global_mapping)
+            return global_mapping
+
+    @staticmethod
+    def invalidate_settings_cache():
+        """Drop cached global settings; call after settings are updated"""
+        invalidate_settings_cache()
+
+    def _build_service_config(self, app: App, blueprint: Blueprint, global_mapping: Dict[str, Any]):
         """
         Build service configuration from service_data and apply compose_transforms.
         Injects global values for fields that support use_global and are not present in service_data.
@@ -84,41 +229,44 @@ class ComposeGenerator:
         Returns:
             Tuple of (service_config, transform_cache)
         """
-        service_config = app.service_data.copy() if app.service_data else {}
+        # The one working copy; the steps below mutate it in place. The
+        # environment dict is copied too since globals and custom env vars
+        # are written into it.
+        service_config = dict(app.service_data or ())
+        environment = service_config.get('environment')
+        if isinstance(environment, dict):
+            service_config['environment'] = dict(environment)
 
         # Inject global values for missing fields that support use_global
-        service_config = self._inject_global_values(service_config, blueprint, global_settings)
+        self._inject_global_values(service_config, blueprint, global_mapping)
 
         # Apply compose_transform functions and get transform cache
-        service_config, transform_cache = self._apply_transforms(service_config, blueprint, app)
+        transform_cache = self._apply_transforms(service_config, blueprint, app)
 
         # Append :${TAG:-latest} to image if no tag/variable present
-        if 'image' in service_config:
-            image = service_config['image']
-            # Don't add tag if already has : or $ (version or variable)
-            if ':' not in image and '$' not in image:
-                service_config['image'] = f"{image}:${{TAG:-latest}}"
+        image = service_config.get('image')
+        if image:
+            service_config['image'] = _apply_image_tag(image)
 
         # Transform network_config to proper networks format if present
         network_config = service_config.pop('network_config', None)
         if network_config:
             # network_config format: {"mastarr_net": {"ipv4_address": "10.21.12.3"}}
-            if 'networks' not in service_config:
-                service_config['networks'] = {}
-
-            if isinstance(service_config['networks'], list):
-                # Convert list to dict with config
-                networks_dict = {}
-                for net in service_config['networks']:
-                    networks_dict[net] = network_config.get(net, {})
-                service_config['networks'] = networks_dict
-            elif isinstance(service_config['networks'], dict):
-                # Merge network config
-                for net_name, net_conf in network_config.items():
-                    if net_name in service_config['networks']:
-                        service_config['networks'][net_name].update(net_conf)
-                    else:
-                        service_config['networks'][net_name] = net_conf
+            networks = service_config.get('networks', {})
+
+            merge = _NETWORK_MERGERS.get(type(networks))
+            if merge is not None:
+                service_config['networks'] = merge(networks, network_config)
+
+        # Drop empty values up front; validating them only for the dump and
+        # cleanup to remove them again is wasted work
+        empty_keys = [
+            key for key, value in service_config.items()
+            if (value is None or value == '' or value == [] or value == {})
+            and key not in _KEEP_EMPTY_SERVICE_KEYS
+        ]
+        for key in empty_keys:
+            del service_config[key]
 
         return service_config, transform_cache
 
@@ -126,73 +274,52 @@ class ComposeGenerator:
         self,
         service_config: Dict[str, Any],
         blueprint: Blueprint,
-        global_settings: GlobalSettings
-    ) -> Dict[str, Any]:
+        global_mapping: Dict[str, Any]
+    ) -> None:
         """
         Inject global values for fields that have use_global set and are missing from service_config.
 
+        service_config is modified in place; callers pass their own working copy.
+
         Args:
-            service_config: Service configuration dict
+            service_config: Service configuration dict (mutated)
             blueprint: Blueprint definition with field schemas
-            global_settings: Global settings to use for injection
-
-        Returns:
-            Updated service_config with global values injected
+            global_mapping: Global values keyed by use_global name
         """
-        result = service_config.copy()
-
-        # Build mapping of global keys to values
-        # USER: Use explicit user field if set, otherwise fallback to PUID:PGID
-        user_value = global_settings.user if global_settings.user else f"{global_settings.puid}:{global_settings.pgid}"
-
-        global_mapping = {
-            "PUID": global_settings.puid,
-            "PGID": global_settings.pgid,
-            "UMASK": global_settings.umask,
-            "TZ": global_settings.timezone,
-            "USER": user_value
-        }
-
-        # Scan blueprint schema for fields with use_global
-        for field_name, field_schema in blueprint.schema_json.items():
-            use_global = field_schema.get('use_global')
-            if not use_global:
-                continue
+        result = service_config
 
-            schema_path = field_schema.get('schema', '')
-            if not schema_path:
-                continue
+        # Collect the values to inject, then merge each target in one update
+        injected_service = {}
+        injected_env = {}
+        environment = None
 
-            # Parse schema path: "service.environment.PUID" or "service.user"
-            parts = schema_path.split('.')
-            if len(parts) < 2 or parts[0] != 'service':
-                continue
-
-            # Check if value exists in service_config
-            if len(parts) == 2:
-                # Service-level field like "service.user"
-                field_key = parts[1]
-                # Inject if field is missing OR if it's None
-                if field_key not in result or result[field_key] is None:
-                    # Field missing or None, inject global value
-                    if use_global in global_mapping:
-                        result[field_key] = global_mapping[use_global]
-                        logger.debug(f"Injected global {use_global} into service.{field_key}")
-
-            elif len(parts) == 3 and parts[1] == 'environment':
+        # Fields with use_global, resolved once per blueprint
+        for use_global, is_env, key in get_global_fields(blueprint):
+            if is_env:
                 # Environment variable like "service.environment.PUID"
-                env_key = parts[2]
-                if 'environment' not in result:
-                    result['environment'] = {}
-
-                # Inject if env var is missing OR if it's None
-                if env_key not in result['environment'] or result['environment'][env_key] is None:
-                    # Environment var missing or None, inject global value
-                    if use_global in global_mapping:
-                        result['environment'][env_key] = global_mapping[use_global]
-                        logger.debug(f"Injected global {use_global} into service.environment.{env_key}")
+                if environment is None:
+                    environment = result.setdefault('environment', {})
+                target, injected = environment, injected_env
+            else:
+                # Service-level field like "service.user"
+                target, injected = result, injected_service
 
-        return result
+            # Inject if the field is missing OR if it's None
+            if key in injected or target.get(key) is not None:
+                continue
+            if use_global in global_mapping:
+                injected[key] = global_mapping[use_global]
+
+        # Skip building the log messages unless debug logging is on
+        log_debug = logger.isEnabledFor(logging.DEBUG)
+        if injected_service:
+            result.update(injected_service)
+            if log_debug:
+                logger.debug(f"Injected globals into service: {', '.join(injected_service)}")
+        if injected_env:
+            environment.update(injected_env)
+            if log_debug:
+                logger.debug(f"Injected globals into service.environment: {', '.join(injected_env)}")
 
     def _apply_transforms(
         self,
@@ -200,53 +327,71 @@ class ComposeGenerator:
         blueprint: Blueprint,
         app: App
     ) -> Dict[str, Any]:
-        """Apply compose_transform functions to convert inputs to compose format"""
-        result = service_data.copy()
+        """
+        Apply compose_transform functions to convert inputs to compose format.
+
+        service_data is modified in place; callers pass their own working copy.
+
+        Returns:
+            transform_cache with data shared between transforms (e.g. custom networks)
+        """
+        result = service_data
         transform_cache = {}
 
-        for field_name, field_schema in blueprint.schema_json.items():
-            transform_type = field_schema.get('compose_transform')
-            if not transform_type:
-                continue
+        transform_plan = get_transform_plan(blueprint)
+        env_list_fields = get_env_list_fields(blueprint)
+
+        # Nothing to transform: no user inputs, or a blueprint without
+        # transform or custom env fields
+        if not app.raw_inputs or not (transform_plan or env_list_fields):
+            return transform_cache
+
+        raw_get = app.raw_inputs.get
+
+        # Preseed the lists the port/volume transforms append to. They are
+        # copies, so lists shared with app.service_data are never extended.
+        ports = result['ports'] = list(result.get('ports') or ())
+        volumes = result['volumes'] = list(result.get('volumes') or ())
 
-            user_value = app.raw_inputs.get(field_name)
+        # Only fields with a known compose_transform, resolved once per blueprint
+        for field_name, transform_func, field_schema in transform_plan:
+            user_value = raw_get(field_name)
             if user_value is None:
                 continue
 
-            # Delegate to transform registry
-            apply_transform(
-                transform_type=transform_type,
-                user_value=user_value,
-                field_schema=field_schema,
-                app=app,
-                result=result,
-                transform_cache=transform_cache
-            )
+            transform_func(user_value, field_schema, app, result, transform_cache)
 
-        # Handle custom environment variables (schema: "service.environment.*")
-        for field_name, field_schema in blueprint.schema_json.items():
-            schema_path = field_schema.get('schema', '')
-            if schema_path == 'service.environment.*':
-                user_value = app.raw_inputs.get(field_name)
-                if isinstance(user_value, list):
-                    if 'environment' not in result:
-                        result['environment'] = {}
+        if not ports:
+            del result['ports']
+        if not volumes:
+            del result['volumes']
 
-                    for item in user_value:
-                        if isinstance(item, dict) and 'key' in item and 'value' in item:
-                            # Skip empty key-value pairs
-                            key = item['key']
-                            value = item['value']
+        # Handle custom environment variables (schema: "service.environment.*")
+        for field_name in env_list_fields:
+            user_value = raw_get(field_name)
+            if isinstance(user_value, list):
+                environment = result.setdefault('environment', {})
 
-                            if not key or key == '':
-                                continue
+                for item in user_value:
+                    if isinstance(item, dict) and 'key' in item and 'value' in item:
+                        # Skip empty key-value pairs
+                        key = item['key']
+                        value = item['value']
 
-                            result['environment'][key] = value
+                        if not key or key == '':
+                            continue
 
-        return result, transform_cache
+                        environment[key] = value
 
+        return transform_cache
 
-    def generate_env_file(self, app_name: str, user_inputs: Dict[str, Any], blueprint: Blueprint) -> str:
+    def generate_env_file(
+        self,
+        app_name: str,
+        user_inputs: Dict[str, Any],
+        blueprint: Blueprint,
+        generated_at: Optional[str] = None
+    ) -> str:
         """
         Generate .env file content with variables extracted from blueprint schema.
         Always includes HOST_PATH.
@@ -255,45 +400,58 @@ class ComposeGenerator:
             app_name: Application database name
             user_inputs: Dictionary of user-provided input values
             blueprint: Blueprint definition to extract env.* schema fields
+            generated_at: Timestamp for the header. Defaults to the time
+                          this generator was created.
 
         Returns:
             String content for .env file
         """
         host_path = self.path_resolver.get_host_stack_path(app_name)
 
+        # Fields with schema: "env.*" from blueprint (HOST_PATH excluded,
+        # it is always written from the resolved host path instead)
+        inputs_get = user_inputs.get
         env_vars = {}
-        env_vars['HOST_PATH'] = host_path
-
-        # Extract fields with schema: "env.*" from blueprint
-        for field_name, field_config in blueprint.schema_json.items():
-            schema_path = field_config.get('schema', '')
-            if schema_path.startswith('env.'):
-                env_var_name = schema_path.split('.', 1)[1]
-                value = user_inputs.get(field_name)
-                if value is not None:
-                    env_vars[env_var_name] = value
-
-        # Build .env file content
-        lines = [
-            "# Auto-generated by Mastarr",
-            f"# Application: {app_name}",
-            f"# Generated: {datetime.now().isoformat()}",
-            "",
-        ]
-
-        # Always add HOST_PATH first
-        lines.append("# Host path for this stack - used for volume mounts")
-        lines.append(f"HOST_PATH={host_path}")
-        lines.append("")
-
-        # Add other env vars
-        for key, value in env_vars.items():
-            if key != 'HOST_PATH':
-                lines.append(f"{key}={value}")
-
-        return '\n'.join(lines)
-
-    def write_env_file(self, app_name: str, user_inputs: Dict[str, Any], blueprint: Blueprint, output_path: str):
+        for field_name, env_var_name in get_env_fields(blueprint):
+            value = inputs_get(field_name)
+            if value is not None:
+                env_vars[env_var_name] = value
+
+        # Everything below the header is deterministic, reuse it for repeat deploys.
+        # Types are part of the key so e.g. True and 1 don't share an entry.
+        try:
+            body = _env_body(host_path, tuple(
+                (key, type(value), value) for key, value in env_vars.items()
+            ))
+        except TypeError:
+            # Unhashable input value, build without the cache
+            body = _env_body.__wrapped__(host_path, tuple(
+                (key, None, value) for key, value in env_vars.items()
+            ))
+
+        if generated_at is None:
+            generated_at = self._run_timestamp
+
+        # Hash everything except the timestamp, so write_env_file can
+        # skip rewriting a file whose content hasn't changed
+        digest = _content_hash(f"{app_name}\n{body}".encode('utf-8'))
+
+        return (
+            f"{_HASH_PREFIX}{digest}\n"
+            "# Auto-generated by Mastarr\n"
+            f"# Application: {app_name}\n"
+            f"# Generated: {generated_at}\n"
+            f"{body}"
+        )
+
+    def write_env_file(
+        self,
+        app_name: str,
+        user_inputs: Dict[str, Any],
+        blueprint: Blueprint,
+        output_path: str,
+        generated_at: Optional[str] = None
+    ):
         """
         Write .env file to disk.
 
@@ -302,110 +460,309 @@ class ComposeGenerator:
             user_inputs: Dictionary of user-provided input values
             blueprint: Blueprint definition
             output_path: Path to write the .env file
+            generated_at: Optional header timestamp, see generate_env_file
         """
-        env_content = self.generate_env_file(app_name, user_inputs, blueprint)
+        env_content = self.generate_env_file(app_name, user_inputs, blueprint, generated_at)
+
+        # The first line is the content hash (timestamp excluded)
+        if _read_first_line(output_path) == env_content[:env_content.index('\n') + 1]:
+            logger.info(f"✓ .env file unchanged, skipped writing {output_path}")
+            return
 
-        with open(output_path, 'w') as f:
-            f.write(env_content)
+        _write_text(output_path, env_content)
 
         logger.info(f"✓ .env file written to {output_path}")
 
-    def write_compose_file(self, compose: ComposeSchema, output_path: str):
+    def write_compose_file(
+        self,
+        compose: Union[ComposeSchema, Dict[str, Any]],
+        output_path: str,
+        fast_writer: bool = True
+    ):
         """
-        Write ComposeSchema to YAML file.
+        Write compose data to YAML file.
         In dry-run mode, prints to console instead of writing to file.
 
         Args:
-            compose: ComposeSchema object
+            compose: Compose dict as returned by generate() (cleaned in
+                     place), or a ComposeSchema object
             output_path: Path to write the compose file
+            fast_writer: Serialize with the direct compose YAML writer instead
+                         of yaml.dump (falls back to yaml.dump for values it
+                         doesn't support)
         """
-        compose_dict = compose.model_dump(exclude_none=True)
+        compose_dict = self._compose_to_dict(compose)
+
+        # The first line records a hash of the content, so an unchanged
+        # file can be detected without dumping or parsing any YAML
+        try:
+            header = f"{_HASH_PREFIX}{_content_hash(_fingerprint(compose_dict))}\n"
+        except TypeError as e:
+            # Not JSON-representable (e.g. non-string keys), always write
+            logger.debug(f"Could not hash compose content for {output_path}: {e}")
+            header = ""
+
+        if header and _read_first_line(output_path) == header:
+            logger.info(f"✓ Compose file unchanged, skipped writing {output_path}")
+            return
+
+        content = None
+        if fast_writer:
+            try:
+                content = compose_yaml.dump(compose_dict)
+            except compose_yaml.UnsupportedValue as e:
+                logger.debug(f"Direct YAML writer fell back to yaml.dump: {e}")
+
+        if content is not None:
+            _write_text(output_path, header + content)
+        else:
+            # yaml.dump emits straight into the buffered file, no intermediate string
+            with open(output_path, 'w', buffering=_WRITE_BUFFER_SIZE) as f:
+                f.write(header)
+                yaml.dump(compose_dict, f, Dumper=_ComposeDumper, default_flow_style=False, sort_keys=False)
 
-        # Remove empty strings, empty dicts, and empty lists recursively
-        compose_dict = self._clean_empty_values(compose_dict)
+        logger.info(f"✓ Compose file written to {output_path}")
 
-        if 'services' in compose_dict:
-            for service_name, service_config in compose_dict['services'].items():
-                if 'environment' in service_config and isinstance(service_config['environment'], dict):
-                    service_config['environment'] = [
-                        f"{k}={v}" for k, v in service_config['environment'].items()
-                    ]
+    def _compose_to_dict(self, compose: Union[ComposeSchema, Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert ComposeSchema to the plain dict that is written as YAML"""
+        if isinstance(compose, dict):
+            compose_dict = compose
+        else:
+            compose_dict = _COMPOSE_SERIALIZER.to_python(compose, exclude_none=True)
 
-        with open(output_path, 'w') as f:
-            yaml.dump(compose_dict, f, default_flow_style=False, sort_keys=False)
+        # Remove empty strings, empty dicts, and empty lists recursively.
+        # ServiceSchema already dumps environment in KEY=value list form.
+        return self._clean_empty_values(compose_dict)
 
-        logger.info(f"✓ Compose file written to {output_path}")
+    def compose_fingerprint(self, compose: Union[ComposeSchema, Dict[str, Any]]) -> bytes:
+        """
+        Key-order independent fingerprint of the compose file content.
+        Much cheaper than a YAML dump for comparing renders.
+        """
+        return _fingerprint(self._compose_to_dict(compose))
 
-    def _clean_empty_values(self, data, parent_key=None):
+    def _clean_empty_values(self, data):
         """
-        Recursively remove empty strings, empty dicts, and empty lists from data.
-        Keeps False and 0 as they are valid values.
+        Remove empty strings, empty dicts, and empty lists from data, in place.
+        Keeps False and 0 as they are valid values. None is dropped from lists.
 
         Special case: Preserves empty dicts in 'networks' sections because
         an empty dict like `my_network: {}` is valid in Docker Compose
         (means attach to network with default settings).
 
         Args:
-            data: Dictionary, list, or other value to clean
-            parent_key: Parent key name for context-aware cleaning
+            data: Dictionary, list, or other value to clean (mutated)
 
         Returns:
-            Cleaned data structure
+            The same data, cleaned
         """
-        if isinstance(data, dict):
-            cleaned = {}
-            for key, value in data.items():
-                # Special case: Preserve empty dicts in networks sections
-                # e.g., networks: {my_network: {}} is valid and means "attach with defaults"
-                if key == 'networks' and isinstance(value, dict):
-                    # Keep networks dict and preserve empty network configs
-                    networks_cleaned = {}
-                    for net_name, net_config in value.items():
-                        # Clean the network config but keep it even if empty
-                        if isinstance(net_config, dict):
-                            net_config_cleaned = self._clean_empty_values(net_config, parent_key='network_config')
-                            # Keep the network entry even if config is empty dict
-                            networks_cleaned[net_name] = net_config_cleaned if net_config_cleaned else {}
-                        else:
-                            networks_cleaned[net_name] = net_config
-                    cleaned[key] = networks_cleaned
-                    continue
-
-                # Recursively clean nested structures
-                cleaned_value = self._clean_empty_values(value, parent_key=key)
-
+        # Walk the containers once in pre-order, then clean them in reverse
+        # so every child is finished (and known to be empty or not) before
+        # its parent decides whether to drop it
+        containers = []
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                containers.append(node)
+                for key, value in node.items():
+                    # Special case: Preserve empty dicts in networks sections
+                    # e.g., networks: {my_network: {}} is valid and means "attach with defaults"
+                    if key == 'networks' and isinstance(value, dict):
+                        # Clean the network configs but keep them even if empty
+                        stack.extend(net_config for net_config in value.values() if isinstance(net_config, dict))
+                    elif isinstance(value, _CONTAINER_TYPES):
+                        stack.append(value)
+            elif isinstance(node, list):
+                containers.append(node)
+                stack.extend(item for item in node if isinstance(item, _CONTAINER_TYPES))
+
+        for node in reversed(containers):
+            if isinstance(node, dict):
                 # Skip empty strings, empty dicts, empty lists
                 # But keep False and 0 as they are valid values
-                if cleaned_value == '' or \
-                   (isinstance(cleaned_value, dict) and len(cleaned_value) == 0) or \
-                   (isinstance(cleaned_value, list) and len(cleaned_value) == 0):
-                    continue
-
-                cleaned[key] = cleaned_value
-            return cleaned
-        elif isinstance(data, list):
-            # Clean each item in the list
-            return [self._clean_empty_values(item, parent_key=parent_key) for item in data if item not in ('', None)]
-        else:
-            return data
+                empty_keys = [
+                    key for key, value in node.items()
+                    if (isinstance(value, str) and value == '')
+                    or (isinstance(value, _CONTAINER_TYPES) and not value
+                        and not (key == 'networks' and isinstance(value, dict)))
+                ]
+                for key in empty_keys:
+                    del node[key]
+            elif any(_is_empty_item(item) for item in node):
+                node[:] = [item for item in node if not _is_empty_item(item)]
+
+        return data
+
+    @classmethod
+    def generate_batch(
+        cls,
+        apps_blueprints: List[Tuple[App, Blueprint]],
+        session: Session = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate composes for several apps with one generator (and at most
+        one database session).
+
+        Args:
+            apps_blueprints: (app, blueprint) pairs to generate
+            session: Optional database session to reuse
+
+        Returns:
+            Compose dicts in input order
+        """
+        generator = cls(session=session)
+        try:
+            return [generator.generate(app, blueprint) for app, blueprint in apps_blueprints]
+        finally:
+            generator.close()
 
     def close(self):
-        """Close database session"""
-        self.db.close()
+        """Close database session if the generator opened it"""
+        if self._owns_session and self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+@lru_cache(maxsize=512)
+def _env_body(host_path: str, env_items: Tuple[Tuple[str, Any, Any], ...]) -> str:
+    """
+    Build the .env content following the header.
+
+    Args:
+        host_path: Host path for the stack
+        env_items: (name, value type, value) for each env var, in order
+
+    Returns:
+        HOST_PATH section followed by the env var lines
+    """
+    # Always add HOST_PATH first
+    body = f"\n# Host path for this stack - used for volume mounts\nHOST_PATH={host_path}\n"
+    if env_items:
+        body += "\n" + "\n".join([f"{key}={value}" for key, _, value in env_items])
+    return body
+
+
+def _merge_network_list(networks: List[str], network_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a list of network names to dict form, with config where given"""
+    return {net: network_config.get(net, {}) for net in networks}
+
+
+def _merge_network_dict(networks: Dict[str, Any], network_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge network config into networks; builds new dicts so service_data isn't mutated"""
+    merged = {
+        net: {**networks[net], **net_conf} if net in networks else net_conf
+        for net, net_conf in network_config.items()
+    }
+    return {**networks, **merged}
+
+
+# Service networks merge handlers, by the stored networks' type
+_NETWORK_MERGERS = {
+    list: _merge_network_list,
+    dict: _merge_network_dict,
+}
+
+
+def _is_empty_item(item: Any) -> bool:
+    """Whether _clean_empty_values drops a list item: None, '' or an empty container"""
+    if item is None:
+        return True
+    if isinstance(item, str):
+        return item == ''
+    return isinstance(item, _CONTAINER_TYPES) and not item
+
+
+def invalidate_settings_cache():
+    """Drop cached global settings; the next generate() reloads them"""
+    global _settings_version
+    _settings_version += 1
+
+
+@event.listens_for(GlobalSettings, "after_insert")
+@event.listens_for(GlobalSettings, "after_update")
+@event.listens_for(GlobalSettings, "after_delete")
+def _on_settings_write(mapper, connection, target):
+    """Invalidate the settings cache when GlobalSettings is flushed through the ORM"""
+    invalidate_settings_cache()
+
+
+def _is_trusted_compose(compose_config: Dict[str, Any]) -> bool:
+    """
+    Check whether ComposeSchema validation would leave compose_config unchanged.
+
+    True when the config only holds already-validated services and
+    networks made of plain options of the expected type. Anything else
+    (volumes, secrets, extra keys, coercible values) goes through full
+    validation so defaults and coercions still apply.
+    """
+    if not compose_config.keys() <= {'services', 'networks'}:
+        return False
+
+    for network_config in (compose_config.get('networks') or {}).values():
+        if not isinstance(network_config, dict):
+            return False
+        for key, value in network_config.items():
+            if type(value) is not _TRUSTED_NETWORK_OPTIONS.get(key):
+                return False
+
+    return True
+
+
+@lru_cache(maxsize=512)
+def _apply_image_tag(image: str) -> str:
+    """
+    Append :${TAG:-latest} unless the image has a tag/digest or a variable.
+
+    Only the last path component is checked for ':', so a registry port
+    (registry.example.com:5000/foo) isn't mistaken for a tag. Any '$'
+    means the reference is templated and left alone.
+    """
+    if '$' in image or ':' in image[image.rfind('/') + 1:]:
+        return image
+    return f"{image}:${{TAG:-latest}}"
+
+
+def _content_hash(data: bytes) -> str:
+    """Short hex digest used in the '# hash:' header of generated files"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _read_first_line(path: str) -> Optional[str]:
+    """First line of a file (with its newline), or None if it can't be read"""
+    try:
+        with open(path, 'r') as f:
+            return f.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _write_text(path: str, content: str):
+    """Write already-rendered text with raw os-level I/O (no io wrapper stack)"""
+    data = memoryview(content.encode('utf-8'))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def _fingerprint(compose_dict: Dict[str, Any]) -> bytes:
+    """Serialize compose data with sorted keys for equality checks"""
+    return orjson.dumps(compose_dict, option=orjson.OPT_SORT_KEYS)
 
 
-def generate_compose(app: App, blueprint: Blueprint) -> ComposeSchema:
+def generate_compose(app: App, blueprint: Blueprint, session: Session = None) -> Dict[str, Any]:
     """
     Convenience function to generate compose.
 
     Args:
         app: App instance with separated schema data
         blueprint: Blueprint definition
+        session: Optional database session to reuse
 
     Returns:
-        ComposeSchema object
+        Compose dict
     """
-    generator = ComposeGenerator()
-    compose = generator.generate(app, blueprint)
-    generator.close()
-    return compose
+    return ComposeGenerator.generate_batch([(app, blueprint)], session=session)[0]
@@ -1,8 +1,9 @@
+import asyncio
 import docker
 import subprocess
 import os
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple
 from pathlib import Path
 from python_on_whales import DockerClient
 from models.database import App, Blueprint, get_session
@@ -11,9 +12,13 @@ from services.compose_generator import generate_compose, ComposeGenerator
 from hooks.base import HookContext, get_hook_executor
 from utils.logger import get_logger
 from utils.path_resolver import PathResolver
+from utils.docker_client import get_docker_client
 
 logger = get_logger("mastarr.installer")
 
+# Maximum number of apps installed at once within a dependency level
+BATCH_INSTALL_CONCURRENCY = 4
+
 
 class AppInstaller:
     """Orchestrates app installation with dependency resolution"""
@@ -21,7 +26,7 @@ class AppInstaller:
     def __init__(self, db=None):
         self.db = db or get_session()
         self.docker = DockerClient()
-        self.docker_client = docker.from_env()
+        self.docker_client = get_docker_client()
         self.path_resolver = PathResolver()
         self.hook_executor = get_hook_executor()
 
@@ -38,8 +43,9 @@ class AppInstaller:
         """
         logger.info(f"Starting batch installation for {len(app_ids)} apps")
 
-        apps = self._get_apps(app_ids)
-        blueprints = self._get_blueprints([app.blueprint_name for app in apps])
+        rows = self._get_apps_with_blueprints(app_ids)
+        apps = [app for app, blueprint in rows]
+        blueprints = {blueprint.name: blueprint for app, blueprint in rows}
 
         missing_prereqs = self._check_missing_prerequisites(apps, blueprints)
         if missing_prereqs:
@@ -48,18 +54,40 @@ class AppInstaller:
                 f"Please install these first or add them to your selection."
             )
 
-        install_order = self._resolve_install_order(apps, blueprints)
-        logger.info(f"Installation order: {[app.name for app in install_order]}")
+        install_levels = self._resolve_install_levels(apps, blueprints)
+        logger.info(
+            f"Installation order: {[[app.name for app in level] for level in install_levels]}"
+        )
 
-        for app in install_order:
-            try:
-                await self.install_single_app(app.id)
-            except Exception as e:
-                logger.error(f"Failed to install {app.name}: {e}")
-                app.status = "error"
-                app.error_message = str(e)
+        # Apps within a level don't depend on each other, so install them concurrently
+        semaphore = asyncio.Semaphore(BATCH_INSTALL_CONCURRENCY)
+
+        async def install(app: App):
+            async with semaphore:
+                installer = AppInstaller()
+                try:
+                    await installer.install_single_app(app.id)
+                finally:
+                    installer.close()
+
+        for level in install_levels:
+            results = await asyncio.gather(
+                *[install(app) for app in level],
+                return_exceptions=True
+            )
+
+            failed = [
+                (app, result)
+                for app, result in zip(level, results)
+                if isinstance(result, BaseException)
+            ]
+            if failed:
+                for app, e in failed:
+                    logger.error(f"Failed to install {app.name}: {e}")
+                    app.status = "error"
+                    app.error_message = str(e)
                 self.db.commit()
-                raise RuntimeError(f"Installation halted due to failure in {app.name}")
+                raise RuntimeError(f"Installation halted due to failure in {failed[0][0].name}")
 
         logger.info("✓ Batch installation completed successfully")
 
@@ -86,42 +114,56 @@ class AppInstaller:
 
         return missing
 
-    def _resolve_install_order(
+    def _resolve_install_levels(
         self,
         apps: List[App],
         blueprints: Dict[str, Blueprint]
-    ) -> List[App]:
-        """Sort apps for installation using topological sort + install_order"""
-        graph = {}
-        in_degree = {}
+    ) -> List[List[App]]:
+        """
+        Group apps into dependency levels using a topological sort.
 
+        Each level only depends on earlier levels (or already installed apps),
+        and is ordered by install_order. Several apps may share a blueprint;
+        an app depends on every selected app of each prerequisite blueprint.
+        """
+        apps_by_blueprint: Dict[str, List[App]] = {}
         for app in apps:
-            blueprint = blueprints[app.blueprint_name]
-            graph[app.blueprint_name] = blueprint.prerequisites
-            in_degree[app.blueprint_name] = len(blueprint.prerequisites)
+            apps_by_blueprint.setdefault(app.blueprint_name, []).append(app)
 
-        sorted_names = []
-        queue = [name for name, degree in in_degree.items() if degree == 0]
-        queue.sort(key=lambda name: blueprints[name].install_order)
+        dependents: Dict[int, List[App]] = {app.id: [] for app in apps}
+        in_degree: Dict[int, int] = {}
 
-        while queue:
-            current = queue.pop(0)
-            sorted_names.append(current)
-
-            for app_name, deps in graph.items():
-                if current in deps:
-                    in_degree[app_name] -= 1
-                    if in_degree[app_name] == 0:
-                        queue.append(app_name)
-
-            queue.sort(key=lambda name: blueprints[name].install_order)
-
-        if len(sorted_names) != len(apps):
-            remaining = set(graph.keys()) - set(sorted_names)
+        for app in apps:
+            # Prerequisites outside the batch are already installed
+            prereq_apps = [
+                prereq_app
+                for prereq in blueprints[app.blueprint_name].prerequisites
+                for prereq_app in apps_by_blueprint.get(prereq, ())
+            ]
+            in_degree[app.id] = len(prereq_apps)
+            for prereq_app in prereq_apps:
+                dependents[prereq_app.id].append(app)
+
+        levels = []
+        level = [app for app in apps if in_degree[app.id] == 0]
+
+        while level:
+            level.sort(key=lambda app: blueprints[app.blueprint_name].install_order)
+            levels.append(level)
+
+            next_level = []
+            for app in level:
+                for dependent in dependents[app.id]:
+                    in_degree[dependent.id] -= 1
+                    if in_degree[dependent.id] == 0:
+                        next_level.append(dependent)
+            level = next_level
+
+        if sum(len(level) for level in levels) != len(apps):
+            remaining = {app.blueprint_name for app in apps if in_degree[app.id] > 0}
             raise ValueError(f"Circular dependency detected: {remaining}")
 
-        app_map = {app.blueprint_name: app for app in apps}
-        return [app_map[name] for name in sorted_names]
+        return levels
 
     async def install_single_app(self, app_id: int, is_initial_install: bool = None):
         """
@@ -154,7 +196,7 @@ class AppInstaller:
         self.db.commit()
 
         try:
-            generator = ComposeGenerator()
+            generator = ComposeGenerator(session=self.db)
 
             compose_obj = generator.generate(app, blueprint)
 
@@ -169,6 +211,10 @@ class AppInstaller:
 
             generator.close()
 
+            # End the read transaction so the pooled connection is not held
+            # while docker compose runs; it is reacquired for the status update
+            self.db.commit()
+
             # Check if dry-run mode is enabled
             dry_run = os.getenv('DRY_RUN', 'false').lower() in ('true', '1', 'yes')
 
@@ -181,7 +227,9 @@ class AppInstaller:
                     # Use container paths for docker compose command
                     # The docker compose CLI runs inside this container, so it needs container paths
                     # The Docker daemon will handle volume mounts for the services being created
-                    result = subprocess.run(
+                    # Run in a worker thread so concurrent installs aren't serialized
+                    result = await asyncio.to_thread(
+                        subprocess.run,
                         [
                             "docker", "compose",
                             "--project-directory", str(stack_path),
@@ -275,14 +323,25 @@ class AppInstaller:
             # Don't fail the installation if hook fails
             # The app is running, just post-config didn't complete
 
-    def _get_apps(self, app_ids: List[int]) -> List[App]:
-        """Fetch apps from database"""
-        return self.db.query(App).filter(App.id.in_(app_ids)).all()
+    def _get_apps_with_blueprints(self, app_ids: List[int]) -> List[Tuple[App, Blueprint]]:
+        """
+        Fetch apps and their blueprints from database in one query.
 
-    def _get_blueprints(self, names: List[str]) -> Dict[str, Blueprint]:
-        """Fetch blueprints from database"""
-        blueprints = self.db.query(Blueprint).filter(Blueprint.name.in_(names)).all()
-        return {bp.name: bp for bp in blueprints}
+        Raises:
+            ValueError: If an app's blueprint does not exist
+        """
+        rows = (
+            self.db.query(App, Blueprint)
+            .outerjoin(App.blueprint)
+            .filter(App.id.in_(app_ids))
+            .all()
+        )
+
+        missing = sorted({app.blueprint_name for app, blueprint in rows if blueprint is None})
+        if missing:
+            raise ValueError(f"Blueprints not found: {', '.join(missing)}")
+
+        return rows
 
     def close(self):
         """Close database session"""
@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from sqlalchemy.orm import Session
 
 from models.database import Blueprint, App
@@ -13,6 +13,21 @@ logger = get_logger(__name__)
 class PresetService:
     def __init__(self, presets_dir: str = "presets"):
         self.presets_dir = Path(presets_dir)
+        # preset file -> (mtime, parsed preset); reparsed when the file changes
+        self._preset_cache: Dict[Path, Tuple[float, Dict[str, Any]]] = {}
+
+    def _load_preset_file(self, preset_file: Path) -> Dict[str, Any]:
+        """Load a preset file, reusing the parsed copy if it hasn't changed"""
+        mtime = preset_file.stat().st_mtime
+        cached = self._preset_cache.get(preset_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(preset_file, 'r') as f:
+            preset_data = json.load(f)
+
+        self._preset_cache[preset_file] = (mtime, preset_data)
+        return preset_data
 
     def get_all_presets(self) -> List[Dict[str, Any]]:
         """Load all preset definitions from the presets directory"""
@@ -24,9 +39,7 @@ class PresetService:
 
         for preset_file in self.presets_dir.glob("*.json"):
             try:
-                with open(preset_file, 'r') as f:
-                    preset_data = json.load(f)
-                    presets.append(preset_data)
+                presets.append(self._load_preset_file(preset_file))
             except Exception as e:
                 logger.error(f"Failed to load preset {preset_file}: {e}")
                 continue
@@ -41,8 +54,7 @@ class PresetService:
             return None
 
         try:
-            with open(preset_file, 'r') as f:
-                return json.load(f)
+            return self._load_preset_file(preset_file)
         except Exception as e:
             logger.error(f"Failed to load preset {preset_id}: {e}")
             return None
@@ -170,20 +182,27 @@ class PresetService:
         skipped = []
         errors = {}
 
+        # Look up all blueprints and existing apps for the preset at once
+        blueprints = {
+            blueprint.name: blueprint
+            for blueprint in db.query(Blueprint).filter(Blueprint.name.in_(app_names))
+        }
+        existing_apps = {
+            row[0]
+            for row in db.query(App.blueprint_name).filter(App.blueprint_name.in_(app_names))
+        }
+
+        new_apps = []
         for app_name in app_names:
             try:
-                blueprint = db.query(Blueprint).filter(Blueprint.name == app_name).first()
+                blueprint = blueprints.get(app_name)
 
                 if not blueprint:
                     skipped.append(app_name)
                     errors[app_name] = "Blueprint not found"
                     continue
 
-                existing_app = db.query(App).filter(
-                    App.blueprint_name == app_name
-                ).first()
-
-                if existing_app:
+                if app_name in existing_apps:
                     skipped.append(app_name)
                     errors[app_name] = "App already exists"
                     continue
@@ -192,25 +211,27 @@ class PresetService:
 
                 inputs = self._fill_default_values(blueprint.schema_json, inputs)
 
-                app = App(
+                new_apps.append(App(
                     name=app_name,
                     db_name=app_name,
                     blueprint_name=app_name,
                     status="configured",
                     raw_inputs=inputs
-                )
-
-                db.add(app)
-                db.flush()
-
-                created_apps.append(app.id)
-                logger.info(f"Created pending app from preset: {app_name} (ID: {app.id})")
+                ))
+                existing_apps.add(app_name)
 
             except Exception as e:
                 logger.error(f"Failed to create app {app_name}: {e}")
                 errors[app_name] = str(e)
                 skipped.append(app_name)
 
+        db.add_all(new_apps)
+        db.flush()
+
+        for app in new_apps:
+            created_apps.append(app.id)
+            logger.info(f"Created pending app from preset: {app.name} (ID: {app.id})")
+
         db.commit()
 
         return {
@@ -2,6 +2,7 @@ import docker
 from datetime import datetime
 from utils.logger import get_logger
 from models.database import SystemHook, get_session
+from utils.docker_client import get_docker_client
 
 logger = get_logger("mastarr.hooks")
 
@@ -10,7 +11,7 @@ class SystemHooks:
     """Execute system lifecycle hooks"""
 
     def __init__(self):
-        self.client = docker.from_env()
+        self.client = get_docker_client()
 
     async def create_mastarr_network(self):
         """
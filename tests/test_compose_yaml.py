@@ -0,0 +1,52 @@
+"""Regression checks: the direct compose YAML writer must match yaml.dump."""
+
+import unittest
+
+import yaml
+
+from utils import compose_yaml
+
+
+def _yaml_dump(data):
+    return yaml.dump(data, default_flow_style=False, sort_keys=False)
+
+
+class ComposeYamlMatchesYamlDumpTest(unittest.TestCase):
+    # Strings yaml.dump quotes or escapes in ways the plain-scalar fast path
+    # got wrong: "..." prefixes (document end marker) and non-ASCII text,
+    # including line-break characters that turn keys into "? key" entries
+    CASES = [
+        "...",
+        ".../x",
+        "....",
+        "..a",
+        "./config",
+        "café",
+        "a\x85b",
+        "a b",
+        "8080",
+        "true",
+        "a:",
+        "${HOST_PATH}/config",
+    ]
+
+    def assert_same_output(self, data):
+        try:
+            emitted = compose_yaml.dump(data)
+        except compose_yaml.UnsupportedValue:
+            return  # write_compose_file falls back to yaml.dump
+        self.assertEqual(emitted, _yaml_dump(data))
+
+    def test_values(self):
+        for value in self.CASES:
+            with self.subTest(value=value):
+                self.assert_same_output({"services": {"app": {"image": value, "command": [value]}}})
+
+    def test_keys(self):
+        for key in self.CASES:
+            with self.subTest(key=key):
+                self.assert_same_output({"services": {key: {"image": "x"}}})
+
+
+if __name__ == "__main__":
+    unittest.main()
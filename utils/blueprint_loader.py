@@ -11,6 +11,19 @@ from utils.logger import get_logger
 
 logger = get_logger("mastarr.blueprint_loader")
 
+# Bumped whenever blueprints are (re)loaded so derived caches can invalidate
+_blueprints_version = 0
+
+
+def get_blueprints_version() -> int:
+    """
+    Get the current blueprint data version.
+
+    Returns:
+        Counter incremented on every blueprint reload
+    """
+    return _blueprints_version
+
 
 def load_blueprints_from_directory(directory: str = "blueprints"):
     """
@@ -84,6 +97,9 @@ def load_blueprints_from_directory(directory: str = "blueprints"):
     finally:
         db.close()
 
+    global _blueprints_version
+    _blueprints_version += 1
+
     logger.info(f"Blueprint loading complete: {loaded_count} loaded, {error_count} errors")
     return loaded_count, error_count
 
@@ -0,0 +1,161 @@
+"""
+Precomputed per-blueprint plans.
+
+Several hot paths walk every field of a blueprint's schema_json to find the
+few fields they care about, re-parsing each field's dotted schema path every
+time. The plans here are derived once per blueprint version and cached by
+(blueprint id, updated_at), so any blueprint update yields a fresh plan.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from models.database import Blueprint
+from utils.compose_transforms import TRANSFORM_REGISTRY
+from utils.logger import get_logger
+
+logger = get_logger("mastarr.blueprint_plan")
+
+# (field_name, transform_func, field_schema) for fields with a compose_transform
+TransformStep = Tuple[str, Callable, Dict[str, Any]]
+
+# (use_global, is_env, key): global setting name, whether the field lives in
+# service.environment, and the service/environment key it maps to
+GlobalField = Tuple[str, bool, str]
+
+# (field_name, env_var_name) for fields written to the stack's .env file
+EnvField = Tuple[str, str]
+
+_PLAN_CACHE_SIZE = 256
+_PLAN_CACHE: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+
+def _cached(kind: str, blueprint: Blueprint, build):
+    """Return the cached plan of the given kind, building it on a miss"""
+    if blueprint.id is None:
+        # Unsaved blueprint, nothing stable to key on
+        return build(blueprint.schema_json)
+
+    key = (kind, blueprint.id, blueprint.updated_at)
+    plan = _PLAN_CACHE.get(key)
+    if plan is None:
+        plan = build(blueprint.schema_json)
+        _PLAN_CACHE[key] = plan
+        if len(_PLAN_CACHE) > _PLAN_CACHE_SIZE:
+            _PLAN_CACHE.popitem(last=False)
+    else:
+        _PLAN_CACHE.move_to_end(key)
+    return plan
+
+
+def get_global_fields(blueprint: Blueprint) -> Tuple[GlobalField, ...]:
+    """
+    Get the fields of a blueprint that fall back to global settings.
+
+    Only "service.<key>" and "service.environment.<KEY>" fields are
+    included, since those are the ones populated from globals at
+    compose generation time.
+
+    Returns:
+        Tuple of (use_global, is_env, key) entries
+    """
+    return _cached("global_fields", blueprint, _build_global_fields)
+
+
+def _build_global_fields(schema_json: dict) -> Tuple[GlobalField, ...]:
+    fields = []
+    for field_schema in schema_json.values():
+        use_global = field_schema.get("use_global")
+        if not use_global:
+            continue
+
+        schema_path = field_schema.get("schema", "")
+        if not schema_path.startswith("service."):
+            continue
+
+        if schema_path.startswith("service.environment."):
+            key = schema_path[20:]
+            is_env = True
+        else:
+            key = schema_path[8:]
+            is_env = False
+
+        # Only direct service keys and environment variables, nothing nested
+        if "." not in key:
+            fields.append((use_global, is_env, key))
+
+    return tuple(fields)
+
+
+def get_transform_plan(blueprint: Blueprint) -> Tuple[TransformStep, ...]:
+    """
+    Get the compose transforms a blueprint applies, resolved to their functions.
+
+    Fields without a compose_transform are dropped, and unknown transform
+    types are reported once here instead of on every generation.
+
+    Returns:
+        Tuple of (field_name, transform_func, field_schema) in schema order
+    """
+    return _cached("transforms", blueprint, _build_transform_plan)
+
+
+def _build_transform_plan(schema_json: dict) -> Tuple[TransformStep, ...]:
+    steps = []
+    for field_name, field_schema in schema_json.items():
+        transform_type = field_schema.get('compose_transform')
+        if not transform_type:
+            continue
+
+        transform_func = TRANSFORM_REGISTRY.get(transform_type)
+        if not transform_func:
+            logger.warning(f"Unknown transform type: {transform_type}")
+            continue
+
+        steps.append((field_name, transform_func, field_schema))
+
+    return tuple(steps)
+
+
+def get_env_fields(blueprint: Blueprint) -> Tuple[EnvField, ...]:
+    """
+    Get the fields of a blueprint that are written to the stack's .env file.
+
+    These are the "env.<NAME>" fields. HOST_PATH is left out since it is
+    always written from the resolved host path.
+
+    Returns:
+        Tuple of (field_name, env_var_name) in schema order
+    """
+    return _cached("env_fields", blueprint, _build_env_fields)
+
+
+def _build_env_fields(schema_json: dict) -> Tuple[EnvField, ...]:
+    fields = []
+    for field_name, field_schema in schema_json.items():
+        schema_path = field_schema.get("schema", "")
+        if schema_path.startswith("env.") and schema_path != "env.HOST_PATH":
+            fields.append((field_name, schema_path[4:]))
+
+    return tuple(fields)
+
+
+def get_env_list_fields(blueprint: Blueprint) -> Tuple[str, ...]:
+    """
+    Get the fields of a blueprint holding custom environment variable lists.
+
+    These are the "service.environment.*" fields, whose inputs are lists of
+    {key, value} items merged into the service environment.
+
+    Returns:
+        Tuple of field names in schema order
+    """
+    return _cached("env_list_fields", blueprint, _build_env_list_fields)
+
+
+def _build_env_list_fields(schema_json: dict) -> Tuple[str, ...]:
+    return tuple(
+        field_name
+        for field_name, field_schema in schema_json.items()
+        if field_schema.get("schema", "") == "service.environment.*"
+    )
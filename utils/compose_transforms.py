@@ -11,6 +11,9 @@ from utils.logger import get_logger
 
 logger = get_logger("mastarr.compose_transforms")
 
+# Prefix for relative bind mount sources ("./x" -> "${HOST_PATH}/x")
+_HOST_PATH_PREFIX = '${HOST_PATH}/'
+
 
 def transform_port_mapping(
     user_value: Any,
@@ -33,32 +36,31 @@ def transform_port_mapping(
         transform_cache: Cache to prevent duplicate processing
     """
     # Handle compound field (object with host/container/protocol)
-    if isinstance(user_value, dict) and 'host' in user_value and 'container' in user_value:
-        if 'ports' not in result:
-            result['ports'] = []
-
-        port_dict = {
-            "published": user_value['host'],
-            "target": user_value['container'],
+    try:
+        host = user_value['host']
+        container = user_value['container']
+    except (TypeError, KeyError):
+        pass
+    else:
+        result.setdefault('ports', []).append({
+            "published": host,
+            "target": container,
             "protocol": user_value.get('protocol', 'tcp')
-        }
-        result['ports'].append(port_dict)
+        })
+        return
 
     # Legacy handling: separate host_port and container_port fields
-    elif 'port_mapping' not in transform_cache:
-        host_port = app.raw_inputs.get('host_port')
-        container_port = app.raw_inputs.get('container_port')
+    if 'port_mapping' not in transform_cache:
+        raw_get = app.raw_inputs.get
+        host_port = raw_get('host_port')
+        container_port = raw_get('container_port')
 
         if host_port and container_port:
-            if 'ports' not in result:
-                result['ports'] = []
-
-            port_dict = {
+            result.setdefault('ports', []).append({
                 "published": host_port,
                 "target": container_port,
                 "protocol": "tcp"
-            }
-            result['ports'].append(port_dict)
+            })
             transform_cache['port_mapping'] = True
 
 
@@ -80,25 +82,25 @@ def transform_port_array(
     if not isinstance(user_value, list):
         return
 
-    if 'ports' not in result:
-        result['ports'] = []
+    ports_append = result.setdefault('ports', []).append
 
     for port_item in user_value:
-        if isinstance(port_item, dict) and 'host' in port_item and 'container' in port_item:
-            # Skip empty port mappings
+        # Skip items that aren't host/container objects
+        try:
             host = port_item['host']
             container = port_item['container']
+        except (TypeError, KeyError):
+            continue
 
-            # Skip if either value is empty string or None
-            if not host or not container or host == '' or container == '':
-                continue
+        # Skip empty port mappings (empty string or None)
+        if not host or not container:
+            continue
 
-            port_dict = {
-                "published": port_item['host'],
-                "target": port_item['container'],
-                "protocol": port_item.get('protocol', 'tcp')
-            }
-            result['ports'].append(port_dict)
+        ports_append({
+            "published": host,
+            "target": container,
+            "protocol": port_item.get('protocol', 'tcp')
+        })
 
 
 def transform_volume_mapping(
@@ -117,47 +119,43 @@ def transform_volume_mapping(
     Legacy mode: If user_value is a string, uses volume_target from field_schema.
     """
     # Handle compound field (object with source/target)
-    if isinstance(user_value, dict) and 'source' in user_value and 'target' in user_value:
-        if 'volumes' not in result:
-            result['volumes'] = []
-
-        volume_dict = {
-            "type": user_value.get('type', 'bind'),
-            "source": user_value['source'],
-            "target": user_value['target']
-        }
-
-        # Only add read_only if explicitly set to True
-        if user_value.get('read_only'):
-            volume_dict['read_only'] = True
-
-        # Handle bind-specific options
-        if volume_dict['type'] == 'bind':
-            bind_options = {}
-            if user_value.get('bind_propagation'):
-                bind_options['propagation'] = user_value['bind_propagation']
-            if 'bind_create_host_path' in user_value and user_value['bind_create_host_path'] is not None:
-                bind_options['create_host_path'] = user_value['bind_create_host_path']
+    try:
+        source = user_value['source']
+        target = user_value['target']
+    except (TypeError, KeyError):
+        # Legacy handling: volume_target from field_schema
+        if isinstance(user_value, str):
+            result.setdefault('volumes', []).append({
+                "type": "bind",
+                "source": user_value,
+                "target": field_schema.get('volume_target', '/data'),
+                "read_only": False
+            })
+        return
 
-            if bind_options:
-                volume_dict['bind'] = bind_options
+    get = user_value.get
+    volume_dict = {
+        "type": get('type', 'bind'),
+        "source": source,
+        "target": target
+    }
 
-        result['volumes'].append(volume_dict)
+    # Only add read_only if explicitly set to True
+    if get('read_only'):
+        volume_dict['read_only'] = True
 
-    # Legacy handling: volume_target from field_schema
-    elif isinstance(user_value, str):
-        volume_target = field_schema.get('volume_target', '/data')
+    # Handle bind-specific options
+    if volume_dict['type'] == 'bind':
+        bind_options = {}
+        if get('bind_propagation'):
+            bind_options['propagation'] = user_value['bind_propagation']
+        if get('bind_create_host_path') is not None:
+            bind_options['create_host_path'] = user_value['bind_create_host_path']
 
-        if 'volumes' not in result:
-            result['volumes'] = []
+        if bind_options:
+            volume_dict['bind'] = bind_options
 
-        volume_dict = {
-            "type": "bind",
-            "source": user_value,
-            "target": volume_target,
-            "read_only": False
-        }
-        result['volumes'].append(volume_dict)
+    result.setdefault('volumes', []).append(volume_dict)
 
 
 def transform_volume_array(
@@ -176,47 +174,49 @@ def transform_volume_array(
     if not isinstance(user_value, list):
         return
 
-    if 'volumes' not in result:
-        result['volumes'] = []
+    volumes_append = result.setdefault('volumes', []).append
 
     for volume_item in user_value:
-        if isinstance(volume_item, dict) and 'source' in volume_item and 'target' in volume_item:
-            # Skip empty volume mappings
+        # Skip items that aren't source/target objects
+        try:
             source = volume_item['source']
             target = volume_item['target']
+        except (TypeError, KeyError):
+            continue
 
-            # Skip if either value is empty string or None
-            if not source or not target or source == '' or target == '':
-                continue
+        # Skip empty volume mappings (empty string or None)
+        if not source or not target:
+            continue
 
-            volume_type = volume_item.get('type', 'bind')
+        get = volume_item.get
+        volume_type = get('type', 'bind')
 
-            # Apply HOST_PATH prepending for bind mounts with relative paths
-            if volume_type == 'bind' and source.startswith('./'):
-                source = f"${{HOST_PATH}}/{source[2:]}"
+        # Apply HOST_PATH prepending for bind mounts with relative paths
+        if volume_type == 'bind' and source.startswith('./'):
+            source = _HOST_PATH_PREFIX + source[2:]
 
-            volume_dict = {
-                "type": volume_type,
-                "source": source,
-                "target": target
-            }
+        volume_dict = {
+            "type": volume_type,
+            "source": source,
+            "target": target
+        }
 
-            # Only add read_only if explicitly set to True
-            if volume_item.get('read_only'):
-                volume_dict['read_only'] = True
+        # Only add read_only if explicitly set to True
+        if get('read_only'):
+            volume_dict['read_only'] = True
 
-            # Handle bind-specific options
-            if volume_type == 'bind':
-                bind_options = {}
-                if volume_item.get('bind_propagation'):
-                    bind_options['propagation'] = volume_item['bind_propagation']
-                if 'bind_create_host_path' in volume_item and volume_item['bind_create_host_path'] is not None:
-                    bind_options['create_host_path'] = volume_item['bind_create_host_path']
+        # Handle bind-specific options
+        if volume_type == 'bind':
+            bind_options = {}
+            if get('bind_propagation'):
+                bind_options['propagation'] = volume_item['bind_propagation']
+            if get('bind_create_host_path') is not None:
+                bind_options['create_host_path'] = volume_item['bind_create_host_path']
 
-                if bind_options:
-                    volume_dict['bind'] = bind_options
+            if bind_options:
+                volume_dict['bind'] = bind_options
 
-            result['volumes'].append(volume_dict)
+        volumes_append(volume_dict)
 
 
 def transform_network_config(
@@ -241,17 +241,16 @@ def transform_network_config(
     ipv4_address = user_value.get('ipv4_address')
 
     if network_name:
-        if 'networks' not in result:
-            result['networks'] = {}
+        networks = result.setdefault('networks', {})
 
         # Add network with optional IP configuration
         if ipv4_address:
-            result['networks'][network_name] = {
+            networks[network_name] = {
                 'ipv4_address': ipv4_address
             }
         else:
             # Network without specific config (use dict to allow merge)
-            result['networks'][network_name] = {}
+            networks[network_name] = {}
 
 
 def transform_custom_networks_array(
@@ -286,12 +285,10 @@ def transform_custom_networks_array(
     if not isinstance(user_value, list):
         return
 
-    if 'networks' not in result:
-        result['networks'] = {}
+    networks = result.setdefault('networks', {})
 
     # Store custom networks in cache for compose-level processing
-    if 'custom_networks' not in transform_cache:
-        transform_cache['custom_networks'] = []
+    custom_networks = transform_cache.setdefault('custom_networks', [])
 
     for network_item in user_value:
         if not isinstance(network_item, dict) or 'network_name' not in network_item:
@@ -335,10 +332,10 @@ def transform_custom_networks_array(
                 continue
 
         # Add to service-level networks (simple attach, no IP config)
-        result['networks'][network_name] = {}
+        networks[network_name] = {}
 
         # Store in cache for compose-level networks section
-        transform_cache['custom_networks'].append({
+        custom_networks.append({
             'name': network_name,
             'mode': mode
         })
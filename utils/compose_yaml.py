@@ -0,0 +1,150 @@
+"""
+Direct YAML writer for compose files.
+
+Compose files only contain plain dicts, lists, strings, ints and bools, so
+they can be written as block-style YAML without going through PyYAML's
+representer/serializer/emitter pipeline. The output matches
+yaml.dump(data, default_flow_style=False, sort_keys=False) for the data it
+supports; anything else raises UnsupportedValue so the caller can fall back
+to yaml.dump.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, List
+
+import yaml
+
+# Strings that are always safe as plain scalars: no spaces, no leading
+# indicator character, no trailing colon. They still need an implicit-type
+# check (e.g. "8080", "true", "null" must be quoted).
+_PLAIN_SAFE = re.compile(r"[A-Za-z0-9_./$][A-Za-z0-9_./$:=@+{}\-]*")
+
+_resolver = yaml.resolver.Resolver()
+
+_STR_TAG = "tag:yaml.org,2002:str"
+
+# yaml.dump's default best_width; strings with spaces crossing it get folded
+_BREAK_COLUMN = 80
+
+# yaml.dump writes longer keys as explicit "? key" entries
+_MAX_SIMPLE_KEY = 128
+
+
+class UnsupportedValue(Exception):
+    """Raised for values the direct writer can't emit identically to yaml.dump"""
+
+
+def dump(data: Any) -> str:
+    """
+    Serialize compose data to block-style YAML.
+
+    Args:
+        data: Top-level mapping (compose dict)
+
+    Returns:
+        YAML document text
+
+    Raises:
+        UnsupportedValue: If data contains a type or string the writer
+                          doesn't handle
+    """
+    if not isinstance(data, dict) or not data:
+        raise UnsupportedValue(type(data).__name__)
+
+    lines: List[str] = []
+    _emit_mapping(data, 0, lines)
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _emit_mapping(data: dict, indent: int, lines: List[str], first_prefix: str = None):
+    """
+    Emit a mapping at the given indent.
+
+    first_prefix replaces the indent of the first key (used for "- " list items).
+    """
+    pad = " " * indent
+    for key, value in data.items():
+        if type(key) is not str or len(key) >= _MAX_SIMPLE_KEY:
+            raise UnsupportedValue(f"key {key!r}")
+
+        prefix = pad
+        if first_prefix is not None:
+            prefix, first_prefix = first_prefix, None
+
+        head = f"{prefix}{_scalar(key, len(prefix))}:"
+
+        if isinstance(value, dict):
+            if value:
+                lines.append(head)
+                _emit_mapping(value, indent + 2, lines)
+            else:
+                lines.append(f"{head} {{}}")
+        elif isinstance(value, list):
+            if value:
+                lines.append(head)
+                _emit_sequence(value, indent, lines)
+            else:
+                lines.append(f"{head} []")
+        else:
+            lines.append(f"{head} {_scalar(value, len(head) + 1)}")
+
+
+def _emit_sequence(data: list, indent: int, lines: List[str]):
+    """Emit a block sequence; items start at the parent key's indent"""
+    pad = " " * indent
+    for item in data:
+        if isinstance(item, dict):
+            if item:
+                _emit_mapping(item, indent + 2, lines, first_prefix=f"{pad}- ")
+            else:
+                lines.append(f"{pad}- {{}}")
+        elif isinstance(item, list):
+            raise UnsupportedValue("nested sequence")
+        else:
+            lines.append(f"{pad}- {_scalar(item, indent + 2)}")
+
+
+def _scalar(value: Any, column: int = 0) -> str:
+    """Format a scalar starting at the given output column the way yaml.dump would"""
+    value_type = type(value)
+    if value_type is str:
+        emitted = _string(value)
+        if column + len(emitted) > _BREAK_COLUMN and " " in emitted:
+            # yaml.dump would fold this at the line width
+            raise UnsupportedValue("long string")
+        return emitted
+    if value_type is bool:
+        return "true" if value else "false"
+    if value_type is int:
+        return str(value)
+    if value is None:
+        return "null"
+    raise UnsupportedValue(value_type.__name__)
+
+
+@lru_cache(maxsize=4096)
+def _string(value: str) -> str:
+    """Format a string scalar, quoting only when YAML requires it"""
+    if not value.isascii():
+        # yaml.dump escapes these, and writes keys with line-break characters
+        # (e.g. \x85, \u2028) as "? key" entries; leave all of it to yaml.dump
+        raise UnsupportedValue("non-ASCII string")
+
+    if _PLAIN_SAFE.fullmatch(value) and not value.endswith(":") and \
+            not value.startswith("...") and \
+            _resolver.resolve(yaml.ScalarNode, value, (True, False)) == _STR_TAG:
+        # "..." is the document end marker, so yaml.dump quotes strings starting with it
+        return value
+
+    # Let PyYAML pick the quoting style for anything unusual
+    emitted = yaml.dump(value, Dumper=yaml.SafeDumper, default_flow_style=False)
+    if emitted.endswith("\n...\n"):
+        emitted = emitted[:-5]
+    emitted = emitted.rstrip("\n")
+
+    if "\n" in emitted:
+        # Folded or multi-line scalars depend on the surrounding indent
+        raise UnsupportedValue("multi-line string")
+    return emitted
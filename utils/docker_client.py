@@ -0,0 +1,21 @@
+"""
+Shared Docker SDK client.
+
+docker.from_env() re-reads the environment, resolves the socket and opens a
+new HTTP session every time. The client is created once and reused so its
+connection pool to the Docker socket is shared across requests.
+"""
+
+import docker
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_docker_client() -> docker.DockerClient:
+    """
+    Get the process-wide Docker client, creating it on first use.
+
+    Returns:
+        Docker SDK client connected via the environment's socket settings
+    """
+    return docker.from_env()
@@ -1,8 +1,8 @@
-import docker
 import os
 from pathlib import Path
 from utils.logger import get_logger
 from utils.blueprint_loader import load_blueprints_from_directory, get_blueprint_count
+from utils.docker_client import get_docker_client
 
 logger = get_logger("mastarr.first_run")
 
@@ -47,7 +47,7 @@ class FirstRunInitializer:
     def _check_docker_connectivity(self):
         """Test Docker connectivity"""
         try:
-            self.client = docker.from_env()
+            self.client = get_docker_client()
             self.client.ping()
             logger.info("✓ Docker daemon is accessible")
 
@@ -106,7 +106,7 @@ class FirstRunInitializer:
     def get_system_info(self) -> dict:
         """Get system information for display"""
         if not self.client:
-            self.client = docker.from_env()
+            self.client = get_docker_client()
 
         info = self.client.info()
 
@@ -1,11 +1,24 @@
-import docker
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict
 from utils.logger import get_logger
+from utils.docker_client import get_docker_client
 
 logger = get_logger("mastarr.path_resolver")
 
+# Resolved container path -> host path, shared by all resolvers in the process.
+# Only successful resolutions are cached; see clear_host_path_cache().
+_host_path_cache: Dict[str, str] = {}
+
+# App name -> host stack directory, filled once /stacks has been resolved
+_host_stack_path_cache: Dict[str, str] = {}
+
+
+def clear_host_path_cache():
+    """Forget resolved host paths; call when path settings change"""
+    _host_path_cache.clear()
+    _host_stack_path_cache.clear()
+
 
 class PathResolver:
     """
@@ -14,10 +27,8 @@ class PathResolver:
     """
 
     def __init__(self):
-        self.client = docker.from_env()
+        self.client = get_docker_client()
         self.container_name = os.getenv("HOSTNAME", "mastarr")
-        self._host_stacks_path: Optional[str] = None
-        self._host_data_path: Optional[str] = None
 
     def resolve_host_path(self, container_path: str) -> str:
         """
@@ -29,6 +40,10 @@ class PathResolver:
         Returns:
             Host path that corresponds to the container path
         """
+        cached = _host_path_cache.get(container_path)
+        if cached is not None:
+            return cached
+
         try:
             container = self.client.containers.get(self.container_name)
 
@@ -38,6 +53,7 @@ class PathResolver:
 
                 if dest == container_path:
                     logger.debug(f"Resolved {container_path} -> {source}")
+                    _host_path_cache[container_path] = source
                     return source
 
                 # Check if container_path is a subdirectory
@@ -45,6 +61,7 @@ class PathResolver:
                     relative = container_path[len(dest):].lstrip('/')
                     host_path = os.path.join(source, relative)
                     logger.debug(f"Resolved {container_path} -> {host_path}")
+                    _host_path_cache[container_path] = host_path
                     return host_path
 
             logger.warning(f"No mount found for {container_path}, returning as-is")
@@ -56,15 +73,13 @@ class PathResolver:
 
     def get_host_stacks_path(self) -> str:
         """Get host path for /stacks directory"""
-        if not self._host_stacks_path:
-            self._host_stacks_path = self.resolve_host_path("/stacks")
-        return self._host_stacks_path
+        # Served from the module cache, so clear_host_path_cache() reaches
+        # every resolver instance
+        return self.resolve_host_path("/stacks")
 
     def get_host_data_path(self) -> str:
         """Get host path for /app/data directory"""
-        if not self._host_data_path:
-            self._host_data_path = self.resolve_host_path("/app/data")
-        return self._host_data_path
+        return self.resolve_host_path("/app/data")
 
     def get_stack_path(self, app_name: str) -> Path:
         """
@@ -88,7 +103,16 @@ class PathResolver:
         Returns:
             Host path to the stack directory
         """
-        return os.path.join(self.get_host_stacks_path(), app_name)
+        cached = _host_stack_path_cache.get(app_name)
+        if cached is not None:
+            return cached
+
+        host_path = os.path.join(self.get_host_stacks_path(), app_name)
+
+        # Only memoize once /stacks resolved; a fallback path is retried
+        if "/stacks" in _host_path_cache:
+            _host_stack_path_cache[app_name] = host_path
+        return host_path
 
     def ensure_stack_directory(self, app_name: str) -> Path:
         """
@@ -0,0 +1,210 @@
+"""
+Compiled input routing for blueprint schemas.
+
+Routing user inputs to service/compose/metadata data depends only on the
+blueprint's field definitions. Instead of re-reading every field definition
+on each create/update, the blueprint's schema is compiled once into a table
+of per-field routing steps and the resulting router is cached per blueprint
+version. Template expansion only changes defaults and schema paths, so the
+few fields with a templated schema path are compiled from the expanded
+schema at route time.
+"""
+
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger("mastarr.schema_router")
+
+Buckets = Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]
+# router(inputs, expanded_schema) -> (service_data, compose_data, metadata_data)
+Router = Callable[[Dict[str, Any], Dict[str, Any]], Buckets]
+Step = Callable[[Buckets, Any], None]
+
+# Bucket index for each schema type: (service_data, compose_data, metadata_data)
+_BUCKETS = {'service': 0, 'compose': 1, 'metadata': 2}
+
+# Most recently used routers, keyed by blueprint version
+_ROUTER_CACHE_SIZE = 256
+_ROUTER_CACHE: "OrderedDict[Hashable, Router]" = OrderedDict()
+
+
+def compile_router(
+    blueprint_name: str,
+    blueprint_id: Optional[int],
+    updated_at: Any,
+    schema_json: Dict[str, Any]
+) -> Router:
+    """
+    Get the compiled router for a blueprint.
+
+    Routers are cached by (blueprint name, id, updated_at), so any blueprint
+    update yields a fresh router.
+
+    Args:
+        blueprint_name: Name of the blueprint
+        blueprint_id: Blueprint row id; None for unsaved blueprints (not cached)
+        updated_at: Blueprint's last update time
+        schema_json: Blueprint schema as stored (template variables unexpanded)
+
+    Returns:
+        Callable taking user inputs and the expanded schema and returning
+        (service_data, compose_data, metadata_data)
+    """
+    if blueprint_id is None:
+        # Unsaved blueprint, nothing stable to key on
+        return _build_router(schema_json)
+
+    key = (blueprint_name, blueprint_id, updated_at)
+    router = _ROUTER_CACHE.get(key)
+    if router is None:
+        router = _build_router(schema_json)
+        _ROUTER_CACHE[key] = router
+        if len(_ROUTER_CACHE) > _ROUTER_CACHE_SIZE:
+            _ROUTER_CACHE.popitem(last=False)
+        logger.debug(f"Compiled input router for {blueprint_name}")
+    else:
+        _ROUTER_CACHE.move_to_end(key)
+    return router
+
+
+def _build_router(schema_json: Dict[str, Any]) -> Router:
+    """Compile every field of the schema into a routing step"""
+    steps: Dict[str, Step] = {}
+    # Fields whose schema path has template variables; their target depends
+    # on the expansion, so they are compiled per call from the expanded schema
+    templated = set()
+    for field_name, field_schema in schema_json.items():
+        schema_path = field_schema.get('schema') if field_schema else None
+        if isinstance(schema_path, str) and '${' in schema_path:
+            templated.add(field_name)
+            continue
+
+        step = _compile_field(field_name, field_schema)
+        if step is not None:
+            steps[field_name] = step
+
+    def route(inputs: Dict[str, Any], expanded_schema: Dict[str, Any]) -> Buckets:
+        buckets = ({}, {}, {})
+        for field_name, field_value in inputs.items():
+            step = steps.get(field_name)
+            if step is None:
+                if field_name not in templated:
+                    continue
+                step = _compile_field(field_name, expanded_schema.get(field_name))
+                if step is None:
+                    continue
+            step(buckets, field_value)
+        return buckets
+
+    return route
+
+
+def _compile_field(field_name: str, field_schema: Dict[str, Any]) -> Optional[Step]:
+    """
+    Compile a single field definition into a routing step.
+
+    Returns None for fields that are never routed (not in blueprint,
+    compose_transform fields, wildcard schemas, env.* fields).
+    """
+    if not field_schema:
+        # Field not in blueprint, skip
+        return None
+
+    # Skip fields with compose_transform - they'll be handled by transform phase
+    if field_schema.get('compose_transform'):
+        return None
+
+    # Get schema routing from field (dot notation), default to service
+    schema_path = field_schema.get('schema') or 'service'
+
+    # Skip wildcard schemas (e.g., "service.environment.*") - handled by compose_generator
+    if schema_path.endswith('.*'):
+        return None
+
+    # Parse schema path: "service.image", "compose.networks", "metadata.admin_user", "env.TAG"
+    parts = schema_path.split('.', 1)
+    schema_type = parts[0]
+
+    # env.* fields go to .env file only; unknown schema types are not routed
+    bucket_index = _BUCKETS.get(schema_type)
+    if bucket_index is None:
+        return None
+
+    # Pre-split once so routing never re-parses the path
+    target_path = tuple(parts[1].split('.')) if len(parts) > 1 else None
+    is_compound = field_schema.get('type') == 'object'
+
+    def step(buckets: Buckets, field_value: Any):
+        data = buckets[bucket_index]
+
+        if target_path is None:
+            # Direct field (no nested path)
+            data[field_name] = field_value
+            return
+
+        # Compound fields (type: "object") are already structured objects.
+        # Service compound fields (port_mapping, volume_mapping) append to arrays.
+        if is_compound and isinstance(field_value, dict):
+            if bucket_index == 0:
+                _append_to_array(data, target_path, field_value)
+            else:
+                _set_nested_value(data, target_path, field_value)
+            return
+
+        if bucket_index == 0:
+            # Special handling for networks - must be a list
+            if target_path == ('networks',) and isinstance(field_value, str):
+                field_value = [field_value]
+
+        elif bucket_index == 1:
+            # Special handling for JSON strings that need parsing
+            if isinstance(field_value, str) and field_value.startswith('{'):
+                try:
+                    field_value = json.loads(field_value)
+                except ValueError:
+                    pass  # Keep as string if parsing fails
+
+        _set_nested_value(data, target_path, field_value)
+
+    return step
+
+
+def _set_nested_value(data: Dict[str, Any], path: Tuple[str, ...], value: Any):
+    """
+    Set a value at a nested path like ('environment', 'VAR_NAME') or just ('image',).
+
+    Args:
+        data: Dictionary to modify
+        path: Pre-split path (e.g., ("environment", "VAR_NAME") or ("image",))
+        value: Value to set
+    """
+    current = data
+    for key in path[:-1]:
+        current = current.setdefault(key, {})
+    current[path[-1]] = value
+
+
+def _append_to_array(data: Dict[str, Any], path: Tuple[str, ...], value: Any):
+    """
+    Append a value to an array at a nested path.
+    Creates the array if it doesn't exist.
+
+    Args:
+        data: Dictionary to modify
+        path: Pre-split path (e.g., ("ports",) or ("nested", "array"))
+        value: Value to append to the array
+    """
+    current = data
+    for key in path[:-1]:
+        current = current.setdefault(key, {})
+
+    # Ensure the target is an array
+    final_key = path[-1]
+    target = current.setdefault(final_key, [])
+    if not isinstance(target, list):
+        target = current[final_key] = [target]
+
+    target.append(value)